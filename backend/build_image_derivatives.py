@@ -0,0 +1,191 @@
+"""
+Responsive image build step.
+
+Reads illustrations.json and, for every illustration, writes content-hashed
+WebP (and AVIF, when Pillow supports it) derivatives at a few widths plus a
+tiny blurred placeholder. The results are described in a manifest that the
+API returns alongside image search results, so clients can lazy-load the
+right size instead of the full-size original.
+
+Derivative filenames include a hash of the source image and encoding
+settings, so unchanged images are skipped on rebuilds and the files can be
+served with immutable caching.
+
+Usage (from the repository root):
+    python -m backend.build_image_derivatives [--prune] [--optional]
+
+With --optional, a missing or limited Pillow skips the step with a warning
+instead of failing, and clients keep using the originals.
+"""
+import os
+import io
+import sys
+import json
+import base64
+import hashlib
+import argparse
+import logging
+from typing import Any, Dict, List
+
+try:
+    from PIL import Image, ImageFilter, features
+except ImportError:  # Pillow is only needed for this build step
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ILLUSTRATIONS_PATH = os.getenv("ILLUSTRATIONS_PATH", "public/illustrations.json")
+ILLUSTRATIONS_DIR = os.getenv("ILLUSTRATIONS_DIR", "public/illustrations")
+DERIVATIVES_DIR = os.getenv("ILLUSTRATION_DERIVATIVES_DIR", "public/illustrations/derived")
+DERIVATIVES_MANIFEST_PATH = os.getenv("ILLUSTRATION_DERIVATIVES_PATH", "public/illustrations-derivatives.json")
+DERIVATIVES_URL_PREFIX = os.getenv("ILLUSTRATION_DERIVATIVES_URL", "/illustrations/derived")
+DERIVATIVE_WIDTHS = [int(w) for w in os.getenv("DERIVATIVE_WIDTHS", "160,320,640,1280").split(",")]
+
+QUALITY = {"webp": 80, "avif": 55}
+PLACEHOLDER_WIDTH = 16
+
+
+def available_formats() -> List[str]:
+    """Output formats supported by the installed Pillow, best first."""
+    formats = []
+    if features.check("avif"):
+        formats.append("avif")
+    if features.check("webp"):
+        formats.append("webp")
+    return formats
+
+
+def target_widths(original_width: int) -> List[int]:
+    """Configured widths that don't upscale, always including at least one."""
+    widths = sorted({w for w in DERIVATIVE_WIDTHS if w < original_width})
+    return widths or [original_width]
+
+
+def encode(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), quality=QUALITY[fmt])
+    return buffer.getvalue()
+
+
+def resize(image, width: int):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def make_placeholder(image) -> str:
+    """Tiny blurred WebP as a data URI, shown while the real image loads."""
+    small = resize(image, PLACEHOLDER_WIDTH).filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    small.save(buffer, format="WEBP", quality=30)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def build_image(filename: str, formats: List[str]) -> Dict[str, Any]:
+    """Write the derivatives of one illustration and describe them."""
+    source_path = os.path.join(ILLUSTRATIONS_DIR, filename)
+    with open(source_path, "rb") as f:
+        source_bytes = f.read()
+    source_hash = hashlib.sha256(source_bytes).hexdigest()
+
+    with Image.open(io.BytesIO(source_bytes)) as opened:
+        image = opened.convert("RGBA" if opened.mode in ("RGBA", "LA", "P") else "RGB")
+
+    stem = os.path.splitext(filename)[0]
+    variants = []
+    for width in target_widths(image.width):
+        resized = None
+        for fmt in formats:
+            digest = hashlib.sha256(f"{source_hash}:{width}:{fmt}:{QUALITY[fmt]}".encode()).hexdigest()[:10]
+            name = f"{stem}-{width}.{digest}.{fmt}"
+            path = os.path.join(DERIVATIVES_DIR, name)
+
+            if not os.path.exists(path):
+                resized = resized or resize(image, width)
+                with open(path, "wb") as f:
+                    f.write(encode(resized, fmt))
+
+            height = max(1, round(image.height * width / image.width))
+            variants.append({
+                "format": fmt,
+                "width": width,
+                "height": height,
+                "bytes": os.path.getsize(path),
+                "url": f"{DERIVATIVES_URL_PREFIX}/{name}",
+            })
+
+    return {
+        "width": image.width,
+        "height": image.height,
+        "placeholder": make_placeholder(image),
+        "variants": variants,
+    }
+
+
+def skip(reason: str, optional: bool) -> int:
+    """Exit status for a build that can't run: a warning when optional, an error otherwise."""
+    if optional:
+        logger.warning(f"{reason}; skipping image derivatives, originals will be served")
+        return 0
+    logger.error(reason)
+    return 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build responsive illustration derivatives.")
+    parser.add_argument("--prune", action="store_true", help="Delete derivative files no longer in the manifest")
+    parser.add_argument("--optional", action="store_true",
+                        help="Skip with a warning instead of failing when Pillow can't build derivatives")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if Image is None:
+        return skip("Pillow is required for this build step: pip install pillow", args.optional)
+
+    formats = available_formats()
+    if not formats:
+        return skip("Installed Pillow supports neither WebP nor AVIF", args.optional)
+
+    with open(ILLUSTRATIONS_PATH, "r", encoding="utf-8") as f:
+        illustrations = json.load(f)
+
+    os.makedirs(DERIVATIVES_DIR, exist_ok=True)
+
+    images = {}
+    for img in illustrations:
+        filename = img.get("file") if isinstance(img, dict) else None
+        if not filename:
+            continue
+        try:
+            images[filename] = build_image(filename, formats)
+            logger.info(f"Built {len(images[filename]['variants'])} derivatives for {filename}")
+        except Exception as e:
+            logger.error(f"Failed to build derivatives for {filename}: {e}")
+
+    manifest_body = json.dumps(images, sort_keys=True)
+    manifest = {
+        "version": hashlib.sha256(manifest_body.encode("utf-8")).hexdigest()[:16],
+        "formats": formats,
+        "images": images,
+    }
+    with open(DERIVATIVES_MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if args.prune:
+        referenced = {os.path.basename(v["url"]) for entry in images.values() for v in entry["variants"]}
+        for name in os.listdir(DERIVATIVES_DIR):
+            if name not in referenced:
+                os.remove(os.path.join(DERIVATIVES_DIR, name))
+                logger.info(f"Pruned stale derivative {name}")
+
+    original_bytes = sum(os.path.getsize(os.path.join(ILLUSTRATIONS_DIR, name)) for name in images)
+    smallest_bytes = sum(min(v["bytes"] for v in entry["variants"]) for entry in images.values())
+    logger.info(
+        f"Wrote manifest for {len(images)} illustrations to {DERIVATIVES_MANIFEST_PATH} "
+        f"(originals {original_bytes / 1024:.0f} KiB, smallest variants {smallest_bytes / 1024:.0f} KiB)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Index build step.
+
+Embeds the source documents into the persistent vector store once, before
+the API workers start. Only new or changed chunks are embedded. With
+CHROMA_PERSIST_DIR set, this is the only process that writes the
+collection: Chroma's persistent client isn't safe to share between
+writing processes, so workers open the collection and only read it. With
+FLAT_INDEX_PATH set, the saved index is updated the same way.
+
+Usage (from the repository root, before starting the workers):
+    python -m backend.build_index
+"""
+import sys
+import json
+import argparse
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from .core.data_loader import load_all_documents
+from .core.indexer import get_existing_ids, index_version
+from .core.llm_chain import create_full_retrieval_chain, CHROMA_PERSIST_DIR, FLAT_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the persistent vector index read by the API workers.")
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if not (CHROMA_PERSIST_DIR or FLAT_INDEX_PATH):
+        logger.error("Set CHROMA_PERSIST_DIR or FLAT_INDEX_PATH; an in-memory index is rebuilt by every worker")
+        return 1
+
+    retriever = create_full_retrieval_chain(load_all_documents(), build=True)
+    ids = get_existing_ids(retriever.vectorstore)
+    print(json.dumps({"chunks": len(ids), "version": index_version(ids)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Admission configuration
+MAX_IN_FLIGHT_LLM = int(os.getenv("MAX_IN_FLIGHT_LLM", "4"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "8"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+
+
+class AdmissionController:
+    """
+    Bounds the number of LLM calls in flight in this worker.
+
+    Up to max_in_flight requests run at once and up to max_queue more may
+    wait, each for at most queue_timeout seconds. Anything beyond that is
+    shed immediately so the caller can answer with a fast degraded response
+    instead of timing out behind a slow provider.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT_LLM, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.held_total = 0
+        # Slots whose work outlived the request, by the task holding them
+        self._held: Dict[asyncio.Task, asyncio.Future] = {}
+        self._wait_time_total = 0.0
+
+    async def acquire(self, timeout: float = None) -> bool:
+        """Try to get a slot, waiting briefly if needed. Returns False when shed."""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.shed_queue_full += 1
+                return False
+
+            timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+            self.waiting += 1
+            self.queued_total += 1
+            start_time = time.time()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                self.shed_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+                self._wait_time_total += time.time() - start_time
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        self.admitted_total += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def hold_until(self, future: asyncio.Future):
+        """
+        Keep the current task's slot after it leaves slot(), until future finishes.
+
+        Used when a worker thread outlives the request's deadline: the request
+        is answered, but the provider call is still in flight and still counts
+        against max_in_flight.
+        """
+        self._held[asyncio.current_task()] = future
+
+    @asynccontextmanager
+    async def slot(self, timeout: float = None):
+        """Context manager yielding whether the request was admitted."""
+        admitted = await self.acquire(timeout)
+        if not admitted:
+            logger.warning(
+                f"Shedding LLM request: {self.in_flight} in flight, {self.waiting} waiting"
+            )
+        try:
+            yield admitted
+        finally:
+            held_by = self._held.pop(asyncio.current_task(), None)
+            if admitted and held_by is not None and not held_by.done():
+                self.held_total += 1
+                held_by.add_done_callback(lambda _: self.release())
+            elif admitted:
+                self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted_total": self.admitted_total,
+            "queued_total": self.queued_total,
+            "shed_total": self.shed_queue_full + self.shed_timeout,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "held_after_deadline": self.held_total,
+            "avg_queue_wait": round(self._wait_time_total / self.queued_total, 3) if self.queued_total else 0.0,
+        }
@@ -0,0 +1,356 @@
+import os
+import re
+import logging
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Per-source size policies for the structure-aware splitter. Chunks follow
+# section boundaries, so no overlap is needed between them; the overlap only
+# applies when a single paragraph or list item is longer than max_chars.
+STRUCTURED_CHUNK_SIZE = int(os.getenv("STRUCTURED_CHUNK_SIZE", "1200"))
+SOURCE_POLICIES: Dict[str, Dict[str, int]] = {
+    ".md": {"max_chars": STRUCTURED_CHUNK_SIZE, "overlap": 100},
+    ".mdx": {"max_chars": STRUCTURED_CHUNK_SIZE, "overlap": 100},
+    ".html": {"max_chars": STRUCTURED_CHUNK_SIZE, "overlap": 100},
+    ".pdf": {"max_chars": int(os.getenv("RESUME_CHUNK_SIZE", "1000")), "overlap": 100},
+}
+DEFAULT_POLICY = {"max_chars": STRUCTURED_CHUNK_SIZE, "overlap": 100}
+
+# Section headings used in the resume PDF, whose text extraction has no markup
+RESUME_SECTIONS = [
+    "Summary", "Technical Skills", "Skills", "Work Experience", "Experience",
+    "Education", "Accomplishments", "Projects", "Certifications",
+]
+_DATE = r"(?:\d{1,2}/\d{4}|[A-Z][a-z]{2,8}\.? \d{4})"
+DATE_RANGE_RE = re.compile(rf"{_DATE}\s*[–—-]\s*(?:{_DATE}|Present|Current)")
+_BULLET_RE = re.compile(r"\s*[●•▪◦]\s*")
+
+_MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_MD_LIST_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_MD_FRONTMATTER_RE = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+
+# A block of text and the section path it belongs to
+Block = Tuple[Tuple[str, ...], str]
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+def parse_markdown(text: str) -> List[Block]:
+    """Split markdown into paragraphs and list items under their heading path."""
+    text = _MD_FRONTMATTER_RE.sub("", text)
+    blocks: List[Block] = []
+    path: List[Tuple[int, str]] = []
+    paragraph: List[str] = []
+    in_code = False
+
+    def flush():
+        if paragraph:
+            content = "\n".join(paragraph).strip()
+            if content:
+                blocks.append((tuple(title for _, title in path), content))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+            paragraph.append(line)
+            continue
+        if in_code:
+            paragraph.append(line)
+            continue
+
+        heading = _MD_HEADING_RE.match(line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            path = [(lvl, title) for lvl, title in path if lvl < level]
+            path.append((level, heading.group(2)))
+        elif not line.strip():
+            flush()
+        elif _MD_LIST_RE.match(line):
+            flush()
+            paragraph.append(line.strip())
+        else:
+            paragraph.append(line.strip())
+    flush()
+    return blocks
+
+
+class _HTMLBlockParser(HTMLParser):
+    """Collects text blocks from block-level elements under h1-h6 headings."""
+
+    BLOCK_TAGS = {"p", "li", "div", "section", "article", "tr", "dd", "dt", "blockquote", "pre"}
+    SKIP_TAGS = {"style", "script", "head", "noscript"}
+
+    def __init__(self):
+        super().__init__()
+        self.blocks: List[Block] = []
+        self.path: List[Tuple[int, str]] = []
+        self._text: List[str] = []
+        self._heading_level: Optional[int] = None
+        self._skip = 0
+
+    def _flush(self):
+        content = _clean("".join(self._text))
+        self._text = []
+        if not content:
+            return
+        if self._heading_level is not None:
+            self.path = [(lvl, title) for lvl, title in self.path if lvl < self._heading_level]
+            self.path.append((self._heading_level, content))
+        else:
+            self.blocks.append((tuple(title for _, title in self.path), content))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif re.fullmatch(r"h[1-6]", tag):
+            self._flush()
+            self._heading_level = int(tag[1])
+        elif tag in self.BLOCK_TAGS or tag == "br":
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif re.fullmatch(r"h[1-6]", tag):
+            self._flush()
+            self._heading_level = None
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def parse_html(text: str) -> List[Block]:
+    """Split HTML into block-level text under its heading path."""
+    parser = _HTMLBlockParser()
+    parser.feed(text)
+    parser.close()
+    return parser.blocks
+
+
+def _split_entries(text: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Split a resume section into entries (jobs, schools) at each date range.
+
+    The extracted text has no markup, so an entry header is taken to be the
+    run of capitalized words (company and location) just before the dates.
+    Returns (entry label, text) pairs.
+    """
+    matches = list(DATE_RANGE_RE.finditer(text))
+    if not matches:
+        return [(None, text)]
+
+    starts = []
+    for match in matches:
+        words = text[:match.start()].rstrip().split(" ")
+        index = len(words)
+        while index > 0 and words[index - 1] and (words[index - 1][0].isupper() or words[index - 1] in ("&", "-")):
+            index -= 1
+        starts.append((len(" ".join(words[:index])), match))
+
+    entries: List[Tuple[Optional[str], str]] = []
+    if starts[0][0] > 0 and text[:starts[0][0]].strip():
+        entries.append((None, text[:starts[0][0]].strip()))
+    for i, (start, match) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        label = text[start:match.start()].strip(" ,") or None
+        entries.append((label, text[match.start():end].strip()))
+    return entries
+
+
+def parse_resume_text(text: str) -> List[Block]:
+    """
+    Split flattened resume text into sections, entries and bullet points.
+
+    A short preamble before the first section (the name) becomes the title
+    of every path, and repeated page headers ("<name> cont.") are removed.
+    """
+    text = _clean(text)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(s) for s in RESUME_SECTIONS) + r")\b")
+
+    # Each known heading starts a section the first time it appears
+    boundaries: List[Tuple[int, int, str]] = []
+    seen = set()
+    for match in pattern.finditer(text):
+        name = match.group(1)
+        if name in seen or any(name in other or other in name for other in seen):
+            continue
+        seen.add(name)
+        boundaries.append((match.start(), match.end(), name))
+
+    root: Tuple[str, ...] = ()
+    sections: List[Tuple[Tuple[str, ...], str]] = []
+    preamble = text[:boundaries[0][0]].strip() if boundaries else text
+    if boundaries and 0 < len(preamble) <= 60:
+        root = (preamble,)
+    elif preamble:
+        sections.append(((), preamble))
+    for i, (start, end, name) in enumerate(boundaries):
+        stop = boundaries[i + 1][0] if i + 1 < len(boundaries) else len(text)
+        body = text[end:stop]
+        if root:
+            body = re.sub(re.escape(root[0]) + r"\s+cont\.?", " ", body)
+        sections.append((root + (name,), _clean(body)))
+
+    blocks: List[Block] = []
+    for path, body in sections:
+        for label, entry in _split_entries(body.strip()):
+            entry_path = path + ((label,) if label else ())
+            for item in _BULLET_RE.split(entry):
+                if item.strip():
+                    blocks.append((entry_path, item.strip()))
+    return blocks
+
+
+def _read_source(source: str) -> Optional[str]:
+    try:
+        with open(source, "r", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def source_blocks(source: str, docs: List[Document]) -> List[Block]:
+    """Parse one source into blocks, preferring the raw file so markup survives."""
+    ext = os.path.splitext(source)[1].lower()
+    raw = _read_source(source) if ext in (".md", ".mdx", ".html", ".htm") else None
+
+    if ext in (".md", ".mdx"):
+        return parse_markdown(raw if raw is not None else "\n\n".join(d.page_content for d in docs))
+    if ext in (".html", ".htm") and raw is not None:
+        return parse_html(raw)
+    if ext == ".pdf":
+        return parse_resume_text(" ".join(d.page_content for d in docs))
+    return [((), d.page_content) for d in docs if d.page_content.strip()]
+
+
+def _strip_title(blocks: List[Block]) -> Tuple[Optional[str], List[Block]]:
+    """Drop a single document-wide title from the front of every path."""
+    tops = {path[0] for path, _ in blocks if path}
+    if len(tops) == 1 and all(path for path, _ in blocks):
+        title = tops.pop()
+        return title, [(path[1:], text) for path, text in blocks]
+    return None, blocks
+
+
+def _common_prefix(paths: List[Tuple[str, ...]]) -> Tuple[str, ...]:
+    prefix = paths[0]
+    for path in paths[1:]:
+        size = 0
+        while size < min(len(prefix), len(path)) and prefix[size] == path[size]:
+            size += 1
+        prefix = prefix[:size]
+    return prefix
+
+
+def pack_blocks(blocks: List[Block], max_chars: int, overlap: int) -> List[Tuple[Tuple[str, ...], str]]:
+    """
+    Pack consecutive blocks into chunks of at most max_chars. A section or
+    subsection (a job entry, say) starts a new chunk when it would not fit
+    whole into the current one, so small neighbouring sections share a chunk
+    while large ones keep their own. A heading line is written whenever the
+    section path changes inside a chunk. Oversized blocks are split on their
+    own. A chunk spanning several top-level sections is labelled with all of
+    them, joined by " | ".
+    """
+    fallback = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=overlap)
+    chunks: List[Tuple[Tuple[str, ...], str]] = []
+    current: List[Block] = []
+    size = 0
+
+    # Rendered size of each (sub)section and of each top-level section, headings included
+    section_sizes: Dict[Tuple[str, ...], int] = {}
+    top_sizes: Dict[Tuple[str, ...], int] = {}
+    for path, text in blocks:
+        if path not in section_sizes:
+            top_sizes[path[:1]] = top_sizes.get(path[:1], 0) + len(" > ".join(path)) + 1
+        section_sizes[path] = section_sizes.get(path, 0) + len(text) + 1
+        top_sizes[path[:1]] = top_sizes.get(path[:1], 0) + len(text) + 1
+
+    def render(group: List[Block]) -> Tuple[Tuple[str, ...], str]:
+        prefix = _common_prefix([path for path, _ in group])
+        lines = [" > ".join(prefix)] if prefix else []
+        label = prefix or (" | ".join(dict.fromkeys(path[0] for path, _ in group if path)),)
+        last_path = prefix
+        for path, text in group:
+            if path != last_path and len(path) > len(prefix):
+                lines.append(" > ".join(path[len(prefix):]))
+                last_path = path
+            lines.append(text)
+        return label if label != ("",) else (), "\n".join(lines)
+
+    def flush():
+        nonlocal size
+        if current:
+            chunks.append(render(current))
+            current.clear()
+        size = 0
+
+    for path, text in blocks:
+        if len(text) > max_chars:
+            flush()
+            for piece in fallback.split_text(text):
+                chunks.append(render([(path, piece)]))
+            continue
+
+        if current:
+            if current[-1][0][:1] != path[:1]:
+                needed = top_sizes[path[:1]]
+            elif path != current[-1][0]:
+                needed = section_sizes[path] + len(" > ".join(path))
+            else:
+                needed = len(text)
+            if size + needed > max_chars:
+                flush()
+        if not current or path != current[-1][0]:
+            size += len(" > ".join(path)) + 1
+        current.append((path, text))
+        size += len(text) + 1
+    flush()
+    return chunks
+
+
+def structure_split(docs: List[Document], policies: Optional[Dict[str, Dict[str, int]]] = None) -> List[Document]:
+    """
+    Split documents along their structure: markdown and HTML headings, list
+    items and resume sections/entries. Each chunk carries a `section_path`
+    metadata entry, and chunk size follows the per-source policy.
+    """
+    policies = policies or SOURCE_POLICIES
+
+    by_source: Dict[str, List[Document]] = {}
+    for doc in docs:
+        by_source.setdefault(str(doc.metadata.get("source", "")), []).append(doc)
+
+    splits: List[Document] = []
+    for source, source_docs in by_source.items():
+        policy = policies.get(os.path.splitext(source)[1].lower(), DEFAULT_POLICY)
+        title, blocks = _strip_title(source_blocks(source, source_docs))
+
+        base_metadata: Dict[str, Any] = {
+            k: v for k, v in source_docs[0].metadata.items() if k not in ("page", "page_label")
+        }
+        if title:
+            base_metadata["title"] = title
+
+        for path, text in pack_blocks(blocks, policy["max_chars"], policy["overlap"]):
+            splits.append(Document(
+                page_content=text,
+                metadata={**base_metadata, "section_path": " > ".join(path)},
+            ))
+
+    return splits
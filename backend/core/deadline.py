@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Deadline configuration (seconds)
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "45"))
+MAX_REQUEST_DEADLINE = float(os.getenv("MAX_REQUEST_DEADLINE", "60"))
+# Don't start an LLM attempt with less budget than this; it could not finish anyway
+MIN_ATTEMPT_BUDGET = float(os.getenv("MIN_ATTEMPT_BUDGET", "2"))
+# Clients may ask for a tighter deadline, in milliseconds
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget."""
+
+
+class Deadline:
+    """Wall-clock budget for one request, shared by every stage that serves it."""
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """Deadline from a client-supplied header, capped at MAX_REQUEST_DEADLINE."""
+        seconds = REQUEST_DEADLINE
+        if value:
+            try:
+                requested = float(value) / 1000
+                if requested > 0:
+                    seconds = requested
+            except ValueError:
+                logger.warning(f"Ignoring invalid {DEADLINE_HEADER} header: {value!r}")
+        return cls(min(seconds, MAX_REQUEST_DEADLINE))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def can_fit(self, seconds: float) -> bool:
+        """Whether something taking this long would still finish in time."""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for a stage: the remaining budget, but never more than cap."""
+        return min(cap, self.remaining())
+
+    def check(self, stage: str):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.budget:.1f}s exceeded before {stage}")
+
+    def callbacks(self):
+        """LangChain callbacks that stop a chain before it starts a stage past the deadline."""
+        return [DeadlineCallbackHandler(self)]
+
+
+class DeadlineCallbackHandler(BaseCallbackHandler):
+    """Aborts the remaining chain stages once the deadline has passed."""
+
+    raise_error = True
+
+    def __init__(self, deadline: Deadline):
+        self.deadline = deadline
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.deadline.check("LLM call")
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.deadline.check("LLM call")
+
+    def on_retriever_start(self, serialized, query, **kwargs):
+        self.deadline.check("retrieval")
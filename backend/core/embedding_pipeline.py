@@ -0,0 +1,105 @@
+import os
+import time
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Pipeline configuration
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "50"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_RETRY_BACKOFF = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "2"))
+EMBEDDING_MAX_BACKOFF = float(os.getenv("EMBEDDING_MAX_BACKOFF", "60"))
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embedding stage for index builds.
+
+    Wraps an embeddings client and embeds documents in fixed-size batches,
+    running up to `concurrency` batches in parallel. Batches that fail with a
+    retryable error (rate limits by default) are retried with exponential
+    backoff and jitter. Progress and throughput are logged, and the figures
+    for the most recent run are kept in `last_run`. Query embeddings go
+    straight to the wrapped client, without batching or retries.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        retry_backoff: float = EMBEDDING_RETRY_BACKOFF,
+        is_retryable: Optional[Callable[[Exception], bool]] = None,
+    ):
+        self.base = base
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.is_retryable = is_retryable or (lambda error: False)
+        self.last_run: Dict[str, Any] = {}
+
+    def _with_retries(self, func: Callable, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = min(EMBEDDING_MAX_BACKOFF, self.retry_backoff * (2 ** attempt))
+                delay += random.uniform(0, delay / 2)
+                logger.warning(
+                    f"Embedding rate limited (attempt {attempt + 1}/{self.max_retries + 1}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        start_time = time.time()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        done_texts = 0
+
+        workers = min(self.concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as executor:
+            futures = {
+                executor.submit(self._with_retries, self.base.embed_documents, batch): index
+                for index, batch in enumerate(batches)
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                results[index] = future.result()
+                done_texts += len(batches[index])
+                logger.info(
+                    f"Embedded batch {completed}/{len(batches)} "
+                    f"({done_texts}/{len(texts)} chunks)"
+                )
+
+        duration = time.time() - start_time
+        self.last_run = {
+            "texts": len(texts),
+            "batches": len(batches),
+            "batch_size": self.batch_size,
+            "concurrency": workers,
+            "duration": round(duration, 3),
+            "texts_per_second": round(len(texts) / duration, 1) if duration > 0 else None,
+        }
+        logger.info(
+            f"Embedded {len(texts)} chunks in {duration:.2f}s "
+            f"({self.last_run['texts_per_second']} chunks/s, {workers} parallel batches)"
+        )
+
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries run inside a request's deadline and admission slot, so they fail fast instead of backing off
+        return self.base.embed_query(text)
@@ -0,0 +1,345 @@
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage
+from .chunking import source_blocks, RESUME_SECTIONS, DATE_RANGE_RE
+
+logger = logging.getLogger(__name__)
+
+# Fact index configuration
+FACT_INDEX_ENABLED = os.getenv("FACT_INDEX_ENABLED", "true").lower() == "true"
+# Share of the question's content words a fact intent must explain before it answers
+FACT_MIN_CONFIDENCE = float(os.getenv("FACT_MIN_CONFIDENCE", "0.8"))
+
+EXPERIENCE_SECTIONS = ("Work Experience", "Experience")
+SKILL_SECTIONS = ("Technical Skills", "Skills", "Technology Stack")
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]*[a-zA-Z]")
+_PHONE_RE = re.compile(r"(?<!\d)(?:\+1[ .-]?)?\(?\d{3}\)?[ .-]\d{3}[ .-]\d{4}(?!\d)")
+_YEARS_RE = re.compile(r"(\d+\+?)\s+years?['’]?\s+(?:of\s+)?(?:professional\s+)?experience([^.]*)", re.IGNORECASE)
+_CATEGORY_RE = re.compile(r"^[-*+]?\s*\*\*(.+?)\*\*\s*:\s*(.+)$")
+# Resume entry labels end in "City, ST"; these words belong to the company name, not the city
+_LOCATION_RE = re.compile(r"^(.*?)\s*,\s*([A-Z]{2})$")
+_COMPANY_WORDS = {
+    "llc", "inc", "corp", "co", "company", "group", "solutions", "financial", "ltd", "labs",
+    "studio", "studios", "agency", "technologies", "systems", "services", "partners",
+}
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1
+)}
+
+_WORD_RE = re.compile(r"[a-z0-9+#.]+")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "has", "have", "had",
+    "what", "whats", "which", "who", "whom", "how", "many", "much", "me", "i", "you", "your", "can", "could", "would",
+    "please", "tell", "about", "of", "for", "to", "in", "on", "at", "with", "and", "or", "list",
+    "give", "show", "some", "any", "all", "there", "this", "that", "it", "s", "know", "i'd", "like",
+}
+_NAME_WORDS = {"nick", "nicks", "berens", "he", "his", "him", "hes"}
+# Words that point back into the conversation ("how long did he work there?")
+_REFERRING_WORDS = {"there", "that", "those", "these", "then", "it", "its", "they", "them", "same"}
+
+# Intent name, trigger pattern, and the words the intent accounts for
+_INTENTS: List[Tuple[str, "re.Pattern", set]] = [
+    ("email", re.compile(r"\be-?mail\b"), {"email", "e", "mail", "address"}),
+    ("contact", re.compile(r"\b(contact|reach|get in touch|phone)\b"),
+     {"contact", "reach", "get", "touch", "phone", "number", "call", "details", "info", "information"}),
+    ("years_experience", re.compile(r"\b(how (many|much) years|years of experience|how long)\b"),
+     {"years", "year", "experience", "long", "working", "worked", "work", "been",
+      "developer", "professional", "coding", "programming", "developing", "total"}),
+    ("employer", re.compile(
+        r"\b(employer|works? (at|for)|working (at|for)|where (does|did|is) \w+ work|where \w+ works|"
+        r"current(ly)? (job|role|position|title)|(most recent|latest) (job|role|position|employer)|company)\b"
+    ), {"where", "work", "works", "working", "employer", "current", "currently", "job", "role", "position",
+        "company", "recent", "recently", "most", "latest", "last", "employed", "now", "today", "title", "for"}),
+    ("skills", re.compile(r"\b(skills?|tech stack|technology stack|technologies|languages|frameworks|tools)\b"),
+     {"skills", "skill", "tech", "technology", "technologies", "stack", "languages", "frameworks", "tools",
+      "use", "uses", "work", "works", "familiar", "proficient", "main", "key", "technical", "expertise"}),
+]
+
+
+@dataclass
+class Fact:
+    """An extracted value and where it came from."""
+    value: Any
+    source: str
+
+
+@dataclass
+class FactAnswer:
+    """Answer produced from the fact index, with its confidence and sources."""
+    answer: str
+    intent: str
+    confidence: float
+    sources: List[str] = field(default_factory=list)
+
+
+def _attribution(source: str, path: Tuple[str, ...]) -> str:
+    # The first path element is the document title, which adds nothing here
+    sections = list(path[1:]) if len(path) > 1 else list(path)
+    return " › ".join([os.path.basename(source)] + sections)
+
+
+def _date_key(value: str) -> Tuple[int, int]:
+    """Sortable (year, month) for resume dates like 3/2025, Jun 2012 or Present."""
+    value = value.strip()
+    if value.lower() in ("present", "current"):
+        return (9999, 12)
+    match = re.match(r"(\d{1,2})/(\d{4})", value)
+    if match:
+        return (int(match.group(2)), int(match.group(1)))
+    match = re.match(r"([A-Za-z]{3})[a-z]*\.? (\d{4})", value)
+    if match:
+        return (int(match.group(2)), _MONTHS.get(match.group(1).lower(), 1))
+    return (0, 0)
+
+
+def split_location(label: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a resume entry label like "Acme Corp Denver, CO" into the employer
+    and its location. The city is the trailing run of capitalized words after
+    the last word that looks like part of a company name.
+    """
+    match = _LOCATION_RE.match(label.strip())
+    if not match:
+        return label.strip(), None
+    words, state = match.group(1).split(), match.group(2)
+
+    city_start = len(words)
+    while city_start > 1:
+        word = words[city_start - 1]
+        if (not word[:1].isupper() or "." in word or word.endswith(",") or word == "&"
+                or word.lower() in _COMPANY_WORDS):
+            break
+        city_start -= 1
+    # Without a company word to anchor on, assume a one-word city
+    if city_start <= 1:
+        city_start = len(words) - 1
+    if city_start == len(words):
+        return label.strip(), None
+    return " ".join(words[:city_start]).rstrip(","), f"{' '.join(words[city_start:])}, {state}"
+
+
+def _is_fragment(item: str, items: List[str]) -> bool:
+    """A one-word item that is only a piece of another item, like "Software" next to "Atlassian Software"."""
+    if " " in item:
+        return False
+    return any(item.lower() in other.lower().split() for other in items if other != item)
+
+
+def _job_title(text: str) -> str:
+    """Leading capitalized words after the dates, stopping where a sentence begins."""
+    words = text.split()
+    title = []
+    for i, word in enumerate(words):
+        if not word[:1].isupper() or word in ("●", "•"):
+            break
+        # "Intern Wrote semantic ..." -- a capitalized word followed by lowercase starts a sentence
+        if title and i + 1 < len(words) and words[i + 1][:1].islower():
+            break
+        title.append(word)
+    return " ".join(title)
+
+
+def extract_facts(docs: List[Document]) -> Dict[str, List[Fact]]:
+    """Extract contact details, jobs, years of experience and skills from source documents."""
+    facts: Dict[str, List[Fact]] = {
+        "email": [], "phone": [], "years_experience": [], "job": [], "skills": [],
+    }
+
+    by_source: Dict[str, List[Document]] = {}
+    for doc in docs:
+        by_source.setdefault(str(doc.metadata.get("source", "")), []).append(doc)
+
+    for source, source_docs in by_source.items():
+        seen_jobs = set()
+        for path, text in source_blocks(source, source_docs):
+            where = _attribution(source, path)
+            flat = " ".join(text.split())
+
+            for email in _EMAIL_RE.findall(flat):
+                facts["email"].append(Fact(email, where))
+            for phone in _PHONE_RE.findall(flat):
+                facts["phone"].append(Fact(phone, where))
+
+            match = _YEARS_RE.search(flat)
+            if match and not facts["years_experience"]:
+                facts["years_experience"].append(Fact((match.group(1), match.group(2).strip()), where))
+
+            section = next((p for p in path if p in SKILL_SECTIONS or p in EXPERIENCE_SECTIONS), None)
+            if section in SKILL_SECTIONS:
+                category = _CATEGORY_RE.match(flat)
+                if category:
+                    items = [item.strip() for item in category.group(2).split(",") if item.strip()]
+                    facts["skills"].append(Fact((category.group(1), items), where))
+                elif len(flat) <= 40 and not flat.endswith(":"):
+                    facts["skills"].append(Fact((section, [flat.lstrip("-*+ ")]), where))
+
+            if section in EXPERIENCE_SECTIONS and path[-1] not in RESUME_SECTIONS and path[-1] not in seen_jobs:
+                dates = DATE_RANGE_RE.match(flat)
+                if dates:
+                    seen_jobs.add(path[-1])
+                    start, end = re.split(r"\s*[–—-]\s*", dates.group(0), maxsplit=1)
+                    employer, location = split_location(path[-1])
+                    facts["job"].append(Fact({
+                        "employer": employer,
+                        "location": location,
+                        "title": _job_title(flat[dates.end():]),
+                        "start": start,
+                        "end": end,
+                    }, where))
+
+    # Merge single skill items into one list per category, keeping order
+    merged: Dict[Tuple[str, str], List[str]] = {}
+    for fact in facts["skills"]:
+        category, items = fact.value
+        bucket = merged.setdefault((category, fact.source.split(" › ")[0]), [])
+        bucket.extend(item for item in items if item not in bucket)
+    facts["skills"] = [
+        Fact((category, [item for item in items if not _is_fragment(item, items)]), f"{source} › {category}" if category in SKILL_SECTIONS else f"{source} › Technology Stack")
+        for (category, source), items in merged.items()
+    ]
+    return facts
+
+
+class FactIndex:
+    """
+    Answers simple factual questions (contact details, employer, years of
+    experience, skills) straight from facts extracted at load time, without
+    an LLM call. A question is answered only when it matches one intent and
+    that intent explains most of its content words; anything else falls
+    through to RAG.
+    """
+
+    def __init__(self, min_confidence: float = FACT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self._facts: Dict[str, List[Fact]] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits: Dict[str, int] = {}
+        self.misses = {"follow_up": 0, "no_intent": 0, "low_confidence": 0, "no_fact": 0}
+
+    def build(self, docs: List[Document]) -> Dict[str, int]:
+        """(Re)extract facts from the source documents; returns counts per fact type."""
+        facts = extract_facts(docs)
+        self._facts = facts
+        counts = {name: len(values) for name, values in facts.items()}
+        logger.info(f"Fact index built: {counts}")
+        return counts
+
+    def _record(self, intent: Optional[str] = None, miss: Optional[str] = None):
+        with self._lock:
+            self.lookups += 1
+            if intent:
+                self.hits[intent] = self.hits.get(intent, 0) + 1
+            else:
+                self.misses[miss] += 1
+
+    @staticmethod
+    def classify(question: str) -> Tuple[Optional[str], float]:
+        """Best matching intent and the share of content words it explains."""
+        text = question.lower().replace("’", "'")
+        words = [w.strip(".") for w in _WORD_RE.findall(text.replace("'s", " s"))]
+        content = [w for w in words if w and w not in _STOPWORDS and w not in _NAME_WORDS]
+
+        best, best_confidence = None, 0.0
+        for intent, pattern, vocabulary in _INTENTS:
+            if not pattern.search(text):
+                continue
+            confidence = sum(w in vocabulary for w in content) / len(content) if content else 1.0
+            if confidence > best_confidence:
+                best, best_confidence = intent, confidence
+        return best, best_confidence
+
+    def answer(self, intent: str) -> Optional[FactAnswer]:
+        facts = self._facts
+        if intent == "email" and facts.get("email"):
+            email = facts["email"][0]
+            return FactAnswer(f"You can reach Nick by email at {email.value}.", intent, 1.0, [email.source])
+
+        if intent == "contact" and (facts.get("email") or facts.get("phone")):
+            lines, sources = [], []
+            for label, name in (("Email", "email"), ("Phone", "phone")):
+                if facts.get(name):
+                    lines.append(f"- {label}: {facts[name][0].value}")
+                    sources.append(facts[name][0].source)
+            return FactAnswer("You can contact Nick here:\n" + "\n".join(lines), intent, 1.0, sources)
+
+        if intent == "years_experience" and facts.get("years_experience"):
+            fact = facts["years_experience"][0]
+            years, detail = fact.value
+            return FactAnswer(
+                f"Nick has {years} years of experience{' ' + detail if detail else ''}.", intent, 1.0, [fact.source]
+            )
+
+        if intent == "employer" and facts.get("job"):
+            job = max(facts["job"], key=lambda fact: (_date_key(fact.value["end"]), _date_key(fact.value["start"])))
+            role = f"{job.value['title']} at {job.value['employer']}" if job.value["title"] else job.value["employer"]
+            if job.value["location"]:
+                role += f" in {job.value['location']}"
+            if _date_key(job.value["end"])[0] == 9999:
+                text = f"Nick currently works as {role} (since {job.value['start']})."
+            else:
+                text = f"Nick's most recent role was {role} ({job.value['start']} – {job.value['end']})."
+            return FactAnswer(text, intent, 1.0, [job.source])
+
+        if intent == "skills" and facts.get("skills"):
+            lines = [f"- {category}: {', '.join(items)}" for category, items in (f.value for f in facts["skills"])]
+            return FactAnswer(
+                "Here are Nick's main skills:\n" + "\n".join(lines), intent, 1.0,
+                [fact.source for fact in facts["skills"]]
+            )
+
+        return None
+
+    def match(self, question: str, chat_history: Optional[List[BaseMessage]] = None) -> Optional[FactAnswer]:
+        """
+        Answer from the index, or None when the question should go to RAG.
+
+        Only standalone questions are answered: with any chat history, or
+        words referring back to it, the question may depend on context the
+        index cannot see ("Which company?" after talking about a project).
+        """
+        if not FACT_INDEX_ENABLED:
+            return None
+
+        words = set(_WORD_RE.findall(question.lower().replace("’", "'")))
+        if chat_history or words & _REFERRING_WORDS:
+            self._record(miss="follow_up")
+            return None
+
+        intent, confidence = self.classify(question)
+        if intent is None:
+            self._record(miss="no_intent")
+            return None
+        if confidence < self.min_confidence:
+            self._record(miss="low_confidence")
+            return None
+
+        result = self.answer(intent)
+        if result is None:
+            self._record(miss="no_fact")
+            return None
+
+        result.confidence = round(confidence, 3)
+        result.answer += "\n\nSource: " + "; ".join(dict.fromkeys(result.sources))
+        self._record(intent=intent)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            return {
+                "enabled": FACT_INDEX_ENABLED,
+                "min_confidence": self.min_confidence,
+                "facts": {name: len(values) for name, values in self._facts.items()},
+                "lookups": self.lookups,
+                "hits": hits,
+                "hit_rate": round(hits / self.lookups, 3) if self.lookups else 0.0,
+                "hits_by_intent": dict(self.hits),
+                "misses": dict(self.misses),
+            }
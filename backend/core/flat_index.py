@@ -0,0 +1,186 @@
+import os
+import json
+import uuid
+import struct
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+FLAT_INDEX_DTYPE = os.getenv("FLAT_INDEX_DTYPE", "float32")
+
+# One file holding a JSON header (records, dtype, shape) followed by the raw matrix,
+# so a save is a single rename and the matrix can still be memory-mapped
+_INDEX_FILE = "index.flat"
+_MAGIC = b"FLATIDX1"
+_ALIGNMENT = 64
+
+
+class FlatVectorStore(VectorStore):
+    """
+    Exact nearest-neighbour search over a single contiguous matrix.
+
+    Embeddings are L2-normalized and stored row-wise as float32 (or float16
+    to halve memory), so a query is one matrix-vector product followed by a
+    top-k selection. For a corpus of a few hundred chunks this is far
+    cheaper than a database-backed store. Saved indexes are loaded as
+    memory-mapped files, so every worker on the host shares the same pages.
+
+    Implements the parts of the VectorStore interface the app uses, plus a
+    Chroma-style get() so the incremental indexer works unchanged.
+    """
+
+    def __init__(self, embedding: Embeddings, dtype: str = FLAT_INDEX_DTYPE):
+        self._embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        # Replaced as a whole on every change, so searches read a consistent snapshot
+        self._state: Tuple[Optional[np.ndarray], List[str], List[str], List[Dict[str, Any]]] = (None, [], [], [])
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._state[1])
+
+    def _normalize(self, vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+
+        vectors = self._normalize(self._embedding.embed_documents(texts)).astype(self.dtype)
+
+        with self._lock:
+            matrix, old_ids, old_texts, old_metadatas = self._state
+            replaced = set(ids)
+            keep = [i for i, existing in enumerate(old_ids) if existing not in replaced]
+            if matrix is not None and keep:
+                vectors = np.vstack([np.asarray(matrix[keep]), vectors])
+            self._state = (
+                np.ascontiguousarray(vectors),
+                [old_ids[i] for i in keep] + ids,
+                [old_texts[i] for i in keep] + texts,
+                [old_metadatas[i] for i in keep] + metadatas,
+            )
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        removed = set(ids)
+        with self._lock:
+            matrix, old_ids, old_texts, old_metadatas = self._state
+            keep = [i for i, existing in enumerate(old_ids) if existing not in removed]
+            self._state = (
+                np.ascontiguousarray(matrix[keep]) if matrix is not None and keep else None,
+                [old_ids[i] for i in keep],
+                [old_texts[i] for i in keep],
+                [old_metadatas[i] for i in keep],
+            )
+        return True
+
+    def get(self, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Chroma-compatible listing of stored records."""
+        _, ids, texts, metadatas = self._state
+        return {"ids": list(ids), "documents": list(texts), "metadatas": list(metadatas)}
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        matrix, ids, texts, metadatas = self._state
+        if matrix is None or not ids:
+            return []
+
+        query = self._normalize(embedding)[0].astype(matrix.dtype)
+        scores = matrix @ query
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(id=ids[i], page_content=texts[i], metadata=dict(metadatas[i])), float(scores[i]))
+            for i in top
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are cosine similarities of normalized vectors
+        return lambda score: max(0.0, score)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "FlatVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    def save(self, directory: str):
+        """Write the index atomically so running workers never see a partial or mixed index."""
+        matrix, ids, texts, metadatas = self._state
+        os.makedirs(directory, exist_ok=True)
+
+        matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=self.dtype)
+        header = json.dumps({"dtype": self.dtype.name, "shape": list(matrix.shape), "ids": ids,
+                             "texts": texts, "metadatas": metadatas}).encode("utf-8")
+        # Pad so the matrix starts on an aligned offset
+        prefix = len(_MAGIC) + 8
+        header += b" " * (-(prefix + len(header)) % _ALIGNMENT)
+
+        # A unique temp name, so workers saving at the same time don't write into each other's file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{_INDEX_FILE}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_MAGIC + struct.pack("<Q", len(header)) + header)
+                f.write(np.ascontiguousarray(matrix, dtype=self.dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(directory, _INDEX_FILE))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        logger.info(f"Saved flat index with {len(ids)} vectors to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings) -> "FlatVectorStore":
+        """Load a saved index, memory-mapping the vectors read-only."""
+        path = os.path.join(directory, _INDEX_FILE)
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a flat index")
+            (header_size,) = struct.unpack("<Q", f.read(8))
+            records = json.loads(f.read(header_size))
+
+        ids, shape = records["ids"], tuple(records["shape"])
+        if shape[0] != len(ids) or len(records["texts"]) != len(ids) or len(records["metadatas"]) != len(ids):
+            raise ValueError(f"{path} is inconsistent: {shape[0]} vectors for {len(ids)} records")
+
+        store = cls(embedding, dtype=records["dtype"])
+        offset = len(_MAGIC) + 8 + header_size
+        matrix = np.memmap(path, dtype=store.dtype, mode="r", offset=offset, shape=shape) if ids else None
+        store._state = (matrix, ids, records["texts"], records["metadatas"])
+        logger.info(f"Loaded flat index with {len(ids)} vectors from {directory}")
+        return store
@@ -0,0 +1,89 @@
+import gzip
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 500
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from the given version parts."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return any(opaque(candidate) == opaque(etag) for candidate in header.split(","))
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """
+    Pick the content encoding the client rates highest. Codings the header
+    doesn't name take the quality of "*", if given; on a tie br wins.
+    """
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.lower().startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    supported = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    """Return an empty 304 carrying the validator and caching headers."""
+    headers = dict(headers)
+    headers["Vary"] = "Accept-Encoding"
+    return Response(status_code=304, headers=headers)
+
+
+def cacheable_json_response(request: Request, payload: Any, headers: Dict[str, str]) -> Response:
+    """Serialize payload as JSON, compressing it according to Accept-Encoding."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    headers = dict(headers)
+    headers["Vary"] = "Accept-Encoding"
+
+    encoding = negotiate_encoding(request) if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding == "br":
+        body = brotli.compress(body)
+        headers["Content-Encoding"] = "br"
+    elif encoding == "gzip":
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,67 @@
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Set
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable ID for a chunk, derived from its source and content."""
+    source = str(doc.metadata.get("source", ""))
+    digest = hashlib.sha256(f"{source}\x00{doc.page_content}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def index_version(ids) -> str:
+    """Fingerprint of an index's contents; equal chunk IDs mean equal indexes."""
+    digest = hashlib.sha256("\n".join(sorted(ids)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def get_existing_ids(vectorstore) -> Set[str]:
+    """Return the IDs of all chunks currently stored in the vector store."""
+    return set(vectorstore.get(include=[])["ids"])
+
+
+def sync_index(vectorstore, splits: List[Document]) -> Dict[str, Any]:
+    """
+    Bring the vector store in line with the given chunks.
+
+    Chunks are identified by content hash, so only new or changed chunks are
+    embedded and chunks that no longer exist are deleted. Everything else is
+    left untouched.
+
+    Returns a report of what changed.
+    """
+    start_time = time.time()
+
+    desired: Dict[str, Document] = {}
+    for doc in splits:
+        cid = chunk_id(doc)
+        doc.metadata["chunk_id"] = cid
+        desired.setdefault(cid, doc)
+
+    existing = get_existing_ids(vectorstore)
+    to_add = [cid for cid in desired if cid not in existing]
+    to_remove = [cid for cid in existing if cid not in desired]
+
+    if to_remove:
+        vectorstore.delete(ids=to_remove)
+    if to_add:
+        vectorstore.add_documents([desired[cid] for cid in to_add], ids=to_add)
+
+    report = {
+        "added": len(to_add),
+        "removed": len(to_remove),
+        "unchanged": len(desired) - len(to_add),
+        "total": len(desired),
+        "version": index_version(desired),
+        "duration": round(time.time() - start_time, 3),
+    }
+    logger.info(
+        f"Index sync: {report['added']} added, {report['removed']} removed, "
+        f"{report['unchanged']} unchanged in {report['duration']:.3f}s"
+    )
+    return report
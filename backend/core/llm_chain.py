@@ -1,17 +1,26 @@
 import os
 import time
+import hashlib
 import logging
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_anthropic import ChatAnthropic
-from langchain_community.vectorstores import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import create_history_aware_retriever, create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, BaseMessage
+from langchain_core.runnables import RunnableLambda
 from google.api_core import exceptions
-import chromadb
+from .indexer import sync_index, get_existing_ids, index_version
+from .chunking import structure_split, SOURCE_POLICIES
+from .flat_index import FlatVectorStore
+from .embedding_pipeline import BatchedEmbeddings
+from .response_cache import create_response_store
+from .tracing import Trace, start_trace, finish_trace
+from .deadline import Deadline, DeadlineExceeded, MIN_ATTEMPT_BUDGET
+from .model_router import ROUTING_ENABLED, classify_question, is_low_confidence, routing_stats
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +28,25 @@ logger = logging.getLogger(__name__)
 PRIMARY_LLM = os.getenv("PRIMARY_LLM", "claude")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
+# Smaller, faster models for simple questions; see core.model_router
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-1.5-flash-8b")
+CLAUDE_FAST_MODEL = os.getenv("CLAUDE_FAST_MODEL", "claude-3-5-haiku-20241022")
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# "structure" follows headings, list items and resume sections; "recursive" uses CHUNK_SIZE/CHUNK_OVERLAP
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structure")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "nickberens_portfolio")
+# Vector store backend: "chroma" or "flat" (NumPy matrix, see core.flat_index)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+# When set, the Chroma collection is persisted here so restarts only embed changed chunks.
+# Chroma's persistent client isn't safe for several writing processes, so the collection
+# is built by `python -m backend.build_index` and API workers only read it.
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR")
+# When set, the flat index is saved here and memory-mapped by every worker
+FLAT_INDEX_PATH = os.getenv("FLAT_INDEX_PATH")
+# Chunks retrieved per question
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
 
 # Rate limiting configuration
 CLAUDE_RETRY_DELAY = int(os.getenv("CLAUDE_RETRY_DELAY", "30"))
@@ -33,34 +57,140 @@ REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
 # Caching configuration
 ENABLE_CACHING = os.getenv("ENABLE_CACHING", "true").lower() == "true"
 CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+# When set, responses are also cached in this SQLite file, shared across workers and restarts
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+# Rows kept in the persistent cache; the oldest are pruned beyond this
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
 
 # Simple in-memory cache
 _response_cache: Dict[str, Dict[str, Any]] = {}
+# Fingerprint of the index answers are generated from; part of every cache key, so workers
+# sharing RESPONSE_CACHE_PATH only share answers when their indexes match
+_index_version = ""
+_persistent_cache = (
+    create_response_store(RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_ENTRIES) if ENABLE_CACHING else None
+)
 
 
-def create_full_retrieval_chain(docs):
-    """Creates the retriever component from a list of documents with enhanced error handling."""
-    logger.info("Creating retrieval chain components...")
+@dataclass
+class FallbackResult:
+    """Answer from invoke_with_fallback and the provider that produced it."""
+    answer: str
+    # "claude", "gemini", "cache", "deadline" or "unavailable"
+    provider: str
+    trace_id: Optional[str] = None
 
-    try:
-        embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+
+def split_documents(docs, strategy: Optional[str] = None, chunk_size: Optional[int] = None,
+                    chunk_overlap: Optional[int] = None):
+    """
+    Split source documents into retrieval chunks.
+
+    chunk_size and chunk_overlap override the configured sizes; for the
+    structure strategy they apply to every source type.
+    """
+    strategy = (strategy or CHUNKING_STRATEGY).lower()
+    if strategy == "structure":
+        policies = None
+        if chunk_size is not None:
+            overlap = chunk_overlap if chunk_overlap is not None else 0
+            policies = {ext: {"max_chars": chunk_size, "overlap": overlap} for ext in SOURCE_POLICIES}
+        splits = structure_split(docs, policies)
+    else:
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
+            chunk_size=chunk_size if chunk_size is not None else CHUNK_SIZE,
+            chunk_overlap=chunk_overlap if chunk_overlap is not None else CHUNK_OVERLAP
         )
         splits = text_splitter.split_documents(docs)
-        logger.info(f"Split {len(docs)} documents into {len(splits)} chunks")
+    logger.info(f"Split {len(docs)} documents into {len(splits)} chunks ({strategy} strategy)")
+    return splits
 
+
+def create_vectorstore(embeddings, backend: Optional[str] = None, persist: bool = True,
+                       collection_name: str = COLLECTION_NAME):
+    """
+    Create (or load) the configured vector store backend.
+
+    persist=False always builds a fresh in-memory store, ignoring
+    CHROMA_PERSIST_DIR and FLAT_INDEX_PATH.
+    """
+    backend = (backend or VECTOR_STORE).lower()
+
+    if backend == "flat":
+        if persist and FLAT_INDEX_PATH and os.path.exists(FLAT_INDEX_PATH):
+            try:
+                return FlatVectorStore.load(FLAT_INDEX_PATH, embeddings)
+            except Exception as e:
+                logger.warning(f"Could not load flat index from {FLAT_INDEX_PATH}, rebuilding: {e}")
+        return FlatVectorStore(embeddings)
+
+    # Imported lazily: chromadb is heavy and not needed for the flat backend
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+
+    if persist and CHROMA_PERSIST_DIR:
+        client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+        logger.info(f"Using persistent Chroma collection at {CHROMA_PERSIST_DIR}")
+    else:
         # Use a purely in-memory Chroma client
-        ephemeral_client = chromadb.EphemeralClient()
-        vectorstore = Chroma.from_documents(
-            documents=splits,
-            embedding=embeddings,
-            client=ephemeral_client,
-            collection_name=COLLECTION_NAME
-        )
+        client = chromadb.EphemeralClient()
+
+    return Chroma(
+        client=client,
+        collection_name=collection_name,
+        embedding_function=embeddings
+    )
+
+
+def save_vectorstore(vectorstore, report: Dict[str, Any]):
+    """Persist a flat index after it changed (Chroma persists on its own)."""
+    if isinstance(vectorstore, FlatVectorStore) and FLAT_INDEX_PATH and (report["added"] or report["removed"]):
+        vectorstore.save(FLAT_INDEX_PATH)
+
+
+def index_is_prebuilt(backend: Optional[str] = None) -> bool:
+    """Whether the index is a persistent Chroma collection that workers read but don't write."""
+    return (backend or VECTOR_STORE).lower() != "flat" and bool(CHROMA_PERSIST_DIR)
+
+
+def create_full_retrieval_chain(docs, embeddings=None, strategy: Optional[str] = None,
+                                chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                                backend: Optional[str] = None, k: Optional[int] = None,
+                                persist: bool = True, collection_name: str = COLLECTION_NAME,
+                                build: bool = False):
+    """
+    Creates the retriever component from a list of documents with enhanced error handling.
 
-        retriever = vectorstore.as_retriever()
+    The keyword arguments override the configured embeddings, chunking,
+    vector store and k, which lets the evaluation harness sweep settings.
+    A prebuilt index (see index_is_prebuilt) is opened as is unless build
+    is set, which only the build_index command does.
+    """
+    logger.info("Creating retrieval chain components...")
+
+    try:
+        if embeddings is None:
+            embeddings = BatchedEmbeddings(
+                GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+                is_retryable=is_rate_limit_error
+            )
+        splits = split_documents(docs, strategy, chunk_size, chunk_overlap)
+
+        vectorstore = create_vectorstore(embeddings, backend, persist, collection_name)
+        if persist and index_is_prebuilt(backend) and not build:
+            ids = get_existing_ids(vectorstore)
+            if not ids:
+                logger.error(
+                    f"Chroma collection at {CHROMA_PERSIST_DIR} is empty; run python -m backend.build_index"
+                )
+            set_index_version(index_version(ids))
+        else:
+            report = sync_index(vectorstore, splits)
+            if persist:
+                save_vectorstore(vectorstore, report)
+                set_index_version(report["version"])
+
+        retriever = vectorstore.as_retriever(search_kwargs={"k": k or RETRIEVER_K})
         logger.info("Retrieval chain created successfully")
         return retriever
 
@@ -69,17 +199,74 @@ def create_full_retrieval_chain(docs):
         raise
 
 
+def refresh_index(retriever, docs) -> Dict[str, Any]:
+    """
+    Re-index changed source documents in place.
+
+    Only chunks whose content changed are re-embedded; the report lists what
+    was added, removed and left untouched. Only this process's retriever is
+    updated. Cached answers aren't cleared: the new index version changes
+    the cache keys, so this worker stops using answers from the old content
+    while other workers keep the entries that match their own index.
+    """
+    splits = split_documents(docs)
+    report = sync_index(retriever.vectorstore, splits)
+    save_vectorstore(retriever.vectorstore, report)
+    set_index_version(report["version"])
+    return report
+
+
+def set_index_version(version: str):
+    global _index_version
+    if version != _index_version:
+        logger.info(f"Serving index version {version}")
+    _index_version = version
+
+
+def create_llm(llm_name: str, timeout: Optional[float] = None, tier: str = "large"):
+    """
+    Create one LLM client; timeout overrides REQUEST_TIMEOUT for its calls.
+    tier "fast" selects the provider's small model.
+    """
+    timeout = REQUEST_TIMEOUT if timeout is None else timeout
+    if llm_name == 'claude':
+        return ChatAnthropic(
+            model=CLAUDE_FAST_MODEL if tier == "fast" else CLAUDE_MODEL,
+            temperature=0.7,
+            timeout=timeout
+        )
+    return ChatGoogleGenerativeAI(
+        model=GEMINI_FAST_MODEL if tier == "fast" else GEMINI_MODEL,
+        temperature=0.7,
+        request_timeout=timeout
+    )
+
+
+def _attempt_llm(llms: Dict[str, Any], llm_name: str, tier: str, deadline: Optional[Deadline]):
+    """
+    Client for one attempt: the shared instance, unless the tier or deadline calls for another.
+
+    With a deadline, every LLM call in the chain (rephrasing the question,
+    then answering it) creates its own client when it starts, so each call
+    only gets what is left of the request's budget at that point.
+    """
+    if deadline:
+        def deadline_llm(_):
+            deadline.check("LLM call")
+            return create_llm(llm_name, timeout=deadline.timeout(REQUEST_TIMEOUT), tier=tier)
+        return RunnableLambda(deadline_llm, name=f"{llm_name} {tier}")
+    if tier != "large":
+        return create_llm(llm_name, tier=tier)
+    return llms[llm_name]
+
+
 def get_llm_instances():
     """Initialize LLM instances with proper error handling, Claude first."""
     llms = {}
 
     # Initialize Claude first (primary)
     try:
-        llms['claude'] = ChatAnthropic(
-            model=CLAUDE_MODEL,
-            temperature=0.7,
-            timeout=REQUEST_TIMEOUT
-        )
+        llms['claude'] = create_llm('claude')
         logger.info(f"Claude model {CLAUDE_MODEL} initialized successfully (PRIMARY)")
     except Exception as e:
         logger.warning(f"Failed to initialize Claude (primary): {e}")
@@ -87,11 +274,7 @@ def get_llm_instances():
 
     # Initialize Gemini as fallback
     try:
-        llms['gemini'] = ChatGoogleGenerativeAI(
-            model=GEMINI_MODEL,
-            temperature=0.7,
-            request_timeout=REQUEST_TIMEOUT
-        )
+        llms['gemini'] = create_llm('gemini')
         logger.info(f"Gemini model {GEMINI_MODEL} initialized successfully (FALLBACK)")
     except Exception as e:
         logger.warning(f"Failed to initialize Gemini (fallback): {e}")
@@ -150,7 +333,9 @@ def get_cache_key(user_input: str, chat_history: List[BaseMessage]) -> str:
         recent_history = chat_history[-2:] if len(chat_history) >= 2 else chat_history
         history_str = str([msg.content for msg in recent_history])
 
-    return f"{user_input}:{hash(history_str)}"
+    # Use a stable digest: hash() is salted per process, which breaks shared caches
+    history_digest = hashlib.sha256(history_str.encode("utf-8")).hexdigest()[:16]
+    return f"{' '.join(user_input.lower().split())}:{history_digest}:{_index_version}"
 
 
 def get_cached_response(cache_key: str) -> Optional[str]:
@@ -158,28 +343,43 @@ def get_cached_response(cache_key: str) -> Optional[str]:
     if not cache_key or not ENABLE_CACHING:
         return None
 
-    if cache_key in _response_cache:
-        cached_data = _response_cache[cache_key]
-        if time.time() - cached_data['timestamp'] < CACHE_TTL:
+    cached_data = _response_cache.get(cache_key)
+    if cached_data is None and _persistent_cache:
+        try:
+            cached_data = _persistent_cache.get(cache_key)
+            if cached_data:
+                _response_cache[cache_key] = cached_data
+        except Exception as e:
+            logger.warning(f"Persistent cache lookup failed: {e}")
+
+    if cached_data:
+        if time.time() - cached_data['timestamp'] < cached_data.get('ttl', CACHE_TTL):
             logger.info("Returning cached response")
             return cached_data['response']
         else:
             # Remove expired cache entry
-            del _response_cache[cache_key]
+            _response_cache.pop(cache_key, None)
 
     return None
 
 
-def cache_response(cache_key: str, response: str):
-    """Cache the response."""
+def cache_response(cache_key: str, response: str, ttl: Optional[int] = None):
+    """Cache the response, optionally with a TTL other than CACHE_TTL."""
     if not cache_key or not ENABLE_CACHING:
         return
 
     _response_cache[cache_key] = {
         'response': response,
-        'timestamp': time.time()
+        'timestamp': time.time(),
+        'ttl': ttl or CACHE_TTL
     }
 
+    if _persistent_cache:
+        try:
+            _persistent_cache.set(cache_key, _response_cache[cache_key])
+        except Exception as e:
+            logger.warning(f"Persistent cache write failed: {e}")
+
     # Simple cache cleanup: remove oldest entries if cache gets too large
     if len(_response_cache) > 100:
         oldest_key = min(_response_cache.keys(),
@@ -187,19 +387,25 @@ def cache_response(cache_key: str, response: str):
         del _response_cache[oldest_key]
 
 
-def invoke_chain_with_llm(llm, retriever, contextualize_q_prompt, qa_prompt, user_input, chat_history):
+def build_rag_chain(llm, retriever, contextualize_q_prompt, qa_prompt):
+    """History-aware retrieval chain for a specific LLM."""
+    history_aware_retriever = create_history_aware_retriever(
+        llm, retriever, contextualize_q_prompt
+    )
+    document_chain = create_stuff_documents_chain(llm, qa_prompt)
+    return create_retrieval_chain(history_aware_retriever, document_chain)
+
+
+def invoke_chain_with_llm(llm, retriever, contextualize_q_prompt, qa_prompt, user_input, chat_history,
+                          callbacks=None):
     """Invoke the RAG chain with a specific LLM."""
     try:
-        history_aware_retriever = create_history_aware_retriever(
-            llm, retriever, contextualize_q_prompt
-        )
-        document_chain = create_stuff_documents_chain(llm, qa_prompt)
-        rag_chain = create_retrieval_chain(history_aware_retriever, document_chain)
+        rag_chain = build_rag_chain(llm, retriever, contextualize_q_prompt, qa_prompt)
 
-        response = rag_chain.invoke({
-            "input": user_input,
-            "chat_history": chat_history
-        })
+        response = rag_chain.invoke(
+            {"input": user_input, "chat_history": chat_history},
+            config={"callbacks": callbacks or []}
+        )
 
         return response.get("answer", "I'm sorry, I couldn't generate a response.")
 
@@ -221,97 +427,329 @@ def is_rate_limit_error(error):
     return any(indicator in error_str for indicator in rate_limit_indicators)
 
 
+def get_llm_order() -> List[Tuple[str, int]]:
+    """Providers to try with their retry delays, based on the PRIMARY_LLM setting."""
+    if PRIMARY_LLM.lower() == "claude":
+        return [('claude', CLAUDE_RETRY_DELAY), ('gemini', GEMINI_RETRY_DELAY)]
+    return [('gemini', GEMINI_RETRY_DELAY), ('claude', CLAUDE_RETRY_DELAY)]
+
+
 def invoke_with_fallback(retriever, chat_history: List[BaseMessage], user_input: str) -> str:
     """
     Claude-first approach with Gemini fallback.
     Enhanced with caching and better error handling.
     """
+    return invoke_with_fallback_result(retriever, chat_history, user_input).answer
+
+
+def invoke_with_fallback_result(retriever, chat_history: List[BaseMessage], user_input: str,
+                                read_cache: bool = True, cache_ttl: Optional[int] = None,
+                                deadline: Optional[Deadline] = None) -> FallbackResult:
+    """
+    Same as invoke_with_fallback, but also reports which provider answered.
+
+    read_cache=False forces a fresh answer (the result is still cached), and
+    cache_ttl overrides CACHE_TTL for the cached result. With a deadline,
+    each attempt only gets the remaining budget, retries and fallbacks that
+    can't finish in time are skipped, and the provider is "deadline" if it
+    runs out. Every call is traced; see core.tracing.
+    """
+    trace = start_trace(
+        "invoke_with_fallback", history_messages=len(chat_history), input_chars=len(user_input),
+        deadline_budget=deadline.budget if deadline else None
+    )
+    result = None
+    try:
+        result = _invoke_with_fallback(trace, retriever, chat_history, user_input, read_cache, cache_ttl,
+                                       deadline)
+        result.trace_id = trace.trace_id
+        return result
+    finally:
+        finish_trace(trace, provider=result.provider if result else "error")
+
+
+def _invoke_with_fallback(trace: Trace, retriever, chat_history: List[BaseMessage], user_input: str,
+                          read_cache: bool, cache_ttl: Optional[int],
+                          deadline: Optional[Deadline] = None) -> FallbackResult:
     if not retriever:
         logger.error("No retriever provided")
-        return "I'm sorry, the AI service is temporarily unavailable."
+        return FallbackResult("I'm sorry, the AI service is temporarily unavailable.", "unavailable")
 
     # Check cache first
     cache_key = get_cache_key(user_input, chat_history)
-    cached_response = get_cached_response(cache_key)
+    cached_response = get_cached_response(cache_key) if read_cache else None
+    trace.event("cache_lookup", hit=bool(cached_response), skipped=not read_cache)
     if cached_response:
-        return cached_response
+        return FallbackResult(cached_response, "cache")
 
     # Get LLM instances
     try:
         llms = get_llm_instances()
     except Exception as e:
         logger.error(f"Failed to initialize LLM instances: {e}")
-        return "I'm sorry, the AI service is temporarily unavailable. Please try again later."
+        return FallbackResult(
+            "I'm sorry, the AI service is temporarily unavailable. Please try again later.",
+            "unavailable"
+        )
 
     # Create prompts
     contextualize_q_prompt, qa_prompt = create_prompts()
 
-    # Define the order of LLM attempts based on PRIMARY_LLM setting
-    if PRIMARY_LLM.lower() == "claude":
-        llm_order = [('claude', CLAUDE_RETRY_DELAY), ('gemini', GEMINI_RETRY_DELAY)]
-    else:
-        llm_order = [('gemini', GEMINI_RETRY_DELAY), ('claude', CLAUDE_RETRY_DELAY)]
+    routed_tier = route_question(trace, retriever, user_input, chat_history)
 
     # Try each LLM in order
-    for llm_name, retry_delay in llm_order:
+    for llm_name, retry_delay in get_llm_order():
         if not llms.get(llm_name):
             logger.warning(f"{llm_name.title()} not available, skipping")
+            trace.event("provider_skipped", provider=llm_name, reason="not available")
             continue
 
-        for attempt in range(MAX_RETRIES + 1):
-            try:
-                logger.info(f"Attempting to use {llm_name.title()} (attempt {attempt + 1}/{MAX_RETRIES + 1})...")
+        # Each provider starts on the routed tier; a failed fast-tier call moves to the large one
+        tier = routed_tier
+        attempt = 0
+        while attempt <= MAX_RETRIES:
+            if deadline and not deadline.can_fit(MIN_ATTEMPT_BUDGET):
+                return _deadline_result(trace, user_input, deadline, llm_name)
+            deadline_callbacks = deadline.callbacks() if deadline else []
 
-                response = invoke_chain_with_llm(
-                    llms[llm_name], retriever, contextualize_q_prompt,
-                    qa_prompt, user_input, chat_history
-                )
+            try:
+                logger.info(f"Attempting to use {llm_name.title()} {tier} tier (attempt {attempt + 1}/{MAX_RETRIES + 1})...")
+
+                with trace.span(f"{llm_name} attempt {attempt + 1}", "attempt",
+                                {"provider": llm_name, "attempt": attempt + 1, "tier": tier}) as span:
+                    response = invoke_chain_with_llm(
+                        _attempt_llm(llms, llm_name, tier, deadline), retriever, contextualize_q_prompt,
+                        qa_prompt, user_input, chat_history,
+                        callbacks=trace.callbacks(span) + deadline_callbacks
+                    )
+                routing_stats.record_latency(tier, span.end - span.start)
+
+                # A weak answer from the fast tier is retried once on the large model
+                if tier == "fast" and is_low_confidence(response) and (
+                        deadline is None or deadline.can_fit(MIN_ATTEMPT_BUDGET)):
+                    tier = _escalate(trace, llm_name, "low_confidence")
+                    with trace.span(f"{llm_name} escalation", "attempt",
+                                    {"provider": llm_name, "attempt": attempt + 1, "tier": tier}) as span:
+                        response = invoke_chain_with_llm(
+                            _attempt_llm(llms, llm_name, tier, deadline), retriever, contextualize_q_prompt,
+                            qa_prompt, user_input, chat_history,
+                            callbacks=trace.callbacks(span) + deadline_callbacks
+                        )
+                    routing_stats.record_latency(tier, span.end - span.start)
 
                 logger.info(f"{llm_name.title()} response successful")
 
                 # Cache the successful response
-                cache_response(cache_key, response)
+                cache_response(cache_key, response, ttl=cache_ttl)
 
-                return response
+                return FallbackResult(response, llm_name)
+
+            except DeadlineExceeded:
+                return _deadline_result(trace, user_input, deadline, llm_name)
 
             except exceptions.ResourceExhausted as e:
                 logger.warning(f"{llm_name.title()} rate limit reached: {e}")
 
-                if attempt < MAX_RETRIES:
+                # The large model has its own limits, so try it before waiting
+                if tier == "fast":
+                    tier = _escalate(trace, llm_name, "fast_error")
+                    continue
+
+                if attempt < MAX_RETRIES and not _retry_exceeds_deadline(trace, deadline, llm_name, retry_delay):
                     logger.info(f"Waiting {retry_delay} seconds before retry...")
+                    trace.event("retry", provider=llm_name, reason="rate_limit", delay=retry_delay)
                     time.sleep(retry_delay)
+                    attempt += 1
                 else:
                     logger.info(f"Max retries reached for {llm_name.title()}")
+                    trace.event("fallback", provider=llm_name, reason="max_retries")
                     break
 
             except Exception as e:
                 logger.error(f"{llm_name.title()} error (attempt {attempt + 1}): {e}")
 
+                # A retired fast model ID or a fast-tier outage shouldn't take the provider down with it
+                if tier == "fast":
+                    tier = _escalate(trace, llm_name, "fast_error")
+                    continue
+
                 # Check if it's a model not found error
                 if "not_found_error" in str(e) or "model:" in str(e):
                     logger.error(f"{llm_name.title()} model not found. Please check the model name.")
+                    trace.event("fallback", provider=llm_name, reason="model_not_found")
                     break
 
                 if is_rate_limit_error(e):
-                    if attempt < MAX_RETRIES:
+                    if attempt < MAX_RETRIES and not _retry_exceeds_deadline(trace, deadline, llm_name, retry_delay):
                         logger.info(f"Rate limit detected, waiting {retry_delay} seconds...")
+                        trace.event("retry", provider=llm_name, reason="rate_limit", delay=retry_delay)
                         time.sleep(retry_delay)
+                        attempt += 1
                     else:
                         logger.info(f"Max retries reached for {llm_name.title()}")
+                        trace.event("fallback", provider=llm_name, reason="max_retries")
                         break
                 else:
                     # For non-rate-limit errors, try next LLM immediately
                     logger.info(f"Non-rate-limit error with {llm_name.title()}, trying next LLM")
+                    trace.event("fallback", provider=llm_name, reason="error")
                     break
 
+    if deadline and deadline.expired():
+        return _deadline_result(trace, user_input, deadline)
+
     # If we get here, all LLMs failed
     logger.error("All LLM attempts failed")
-    return (
+    return FallbackResult(
         "I'm sorry, I'm currently experiencing technical difficulties. "
-        "This might be due to high demand or service issues. Please try again in a few minutes."
+        "This might be due to high demand or service issues. Please try again in a few minutes.",
+        "unavailable"
     )
 
 
+def stream_with_fallback(retriever, chat_history: List[BaseMessage], user_input: str,
+                         deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Streaming counterpart of invoke_with_fallback, yielding (provider, text) pieces of the answer.
+
+    A provider that fails before producing any text falls back to the next
+    one; a failure part-way through an answer ends the stream. Rate-limit
+    retries are not attempted since the client is already waiting on the
+    stream. Complete answers are cached.
+    """
+    trace = start_trace(
+        "stream_with_fallback", history_messages=len(chat_history), input_chars=len(user_input),
+        deadline_budget=deadline.budget if deadline else None
+    )
+    provider = None
+    try:
+        if not retriever:
+            provider = "unavailable"
+            yield provider, "I'm sorry, the AI service is temporarily unavailable."
+            return
+
+        cache_key = get_cache_key(user_input, chat_history)
+        cached_response = get_cached_response(cache_key)
+        trace.event("cache_lookup", hit=bool(cached_response), skipped=False)
+        if cached_response:
+            provider = "cache"
+            yield provider, cached_response
+            return
+
+        try:
+            llms = get_llm_instances()
+        except Exception as e:
+            logger.error(f"Failed to initialize LLM instances: {e}")
+            provider = "unavailable"
+            yield provider, "I'm sorry, the AI service is temporarily unavailable. Please try again later."
+            return
+
+        contextualize_q_prompt, qa_prompt = create_prompts()
+
+        # Streamed text can't be taken back, so a fast-tier answer is never escalated for
+        # low confidence; a fast-tier call that fails before any text still moves to the large one
+        routed_tier = route_question(trace, retriever, user_input, chat_history)
+        tiers = ["fast", "large"] if routed_tier == "fast" else ["large"]
+        attempts = [(llm_name, tier) for llm_name, _ in get_llm_order() for tier in tiers]
+
+        for llm_name, tier in attempts:
+            if not llms.get(llm_name):
+                if tier == tiers[0]:
+                    trace.event("provider_skipped", provider=llm_name, reason="not available")
+                continue
+
+            if deadline and not deadline.can_fit(MIN_ATTEMPT_BUDGET):
+                result = _deadline_result(trace, user_input, deadline, llm_name)
+                provider = result.provider
+                yield provider, result.answer
+                return
+            deadline_callbacks = deadline.callbacks() if deadline else []
+
+            parts = []
+            try:
+                with trace.span(f"{llm_name} stream", "attempt",
+                                {"provider": llm_name, "attempt": 1, "tier": tier}) as span:
+                    llm = _attempt_llm(llms, llm_name, tier, deadline)
+                    rag_chain = build_rag_chain(llm, retriever, contextualize_q_prompt, qa_prompt)
+                    for chunk in rag_chain.stream(
+                        {"input": user_input, "chat_history": chat_history},
+                        config={"callbacks": trace.callbacks(span) + deadline_callbacks}
+                    ):
+                        text = chunk.get("answer")
+                        if text:
+                            parts.append(text)
+                            yield llm_name, text
+            except DeadlineExceeded:
+                if parts:
+                    trace.event("deadline_exceeded", provider=llm_name, budget=deadline.budget)
+                    provider = "deadline"
+                    return
+                result = _deadline_result(trace, user_input, deadline, llm_name)
+                provider = result.provider
+                yield provider, result.answer
+                return
+            except Exception as e:
+                if parts:
+                    logger.error(f"{llm_name.title()} stream failed part-way: {e}")
+                    raise
+                logger.error(f"{llm_name.title()} {tier} tier stream error: {e}")
+                if tier == "fast":
+                    _escalate(trace, llm_name, "fast_error")
+                else:
+                    trace.event("fallback", provider=llm_name, reason="error")
+                continue
+
+            routing_stats.record_latency(tier, span.end - span.start)
+            provider = llm_name
+            cache_response(cache_key, "".join(parts))
+            return
+
+        logger.error("All LLM stream attempts failed")
+        provider = "unavailable"
+        yield provider, (
+            "I'm sorry, I'm currently experiencing technical difficulties. "
+            "This might be due to high demand or service issues. Please try again in a few minutes."
+        )
+    finally:
+        finish_trace(trace, provider=provider or "error")
+
+
+def route_question(trace: Trace, retriever, user_input: str, chat_history: List[BaseMessage]) -> str:
+    """Pick the model tier for a question and record the decision."""
+    if not ROUTING_ENABLED:
+        return "large"
+    decision = classify_question(user_input, chat_history, retriever)
+    routing_stats.record_decision(decision)
+    trace.event("route", tier=decision.tier, score=decision.score, reasons=decision.reasons,
+                score_spread=decision.score_spread)
+    logger.info(f"Routing to {decision.tier} tier (score {decision.score}: {', '.join(decision.reasons) or 'simple'})")
+    return decision.tier
+
+
+def _escalate(trace: Trace, llm_name: str, reason: str) -> str:
+    """Record moving a fast-tier request to the large model; returns the new tier."""
+    logger.info(f"Escalating {llm_name.title()} from the fast tier to the large model ({reason})")
+    trace.event("escalate", provider=llm_name, reason=reason)
+    routing_stats.record_escalation()
+    return "large"
+
+
+def _retry_exceeds_deadline(trace: Trace, deadline: Optional[Deadline], llm_name: str, retry_delay: int) -> bool:
+    """Whether waiting retry_delay and trying again would overrun the deadline."""
+    if deadline is None or deadline.can_fit(retry_delay + MIN_ATTEMPT_BUDGET):
+        return False
+    logger.info(f"Skipping {llm_name.title()} retry: {deadline.remaining():.1f}s left, retry needs {retry_delay}s")
+    trace.event("retry_skipped", provider=llm_name, reason="deadline", remaining=round(deadline.remaining(), 3))
+    return True
+
+
+def _deadline_result(trace: Trace, user_input: str, deadline: Deadline,
+                     llm_name: Optional[str] = None) -> FallbackResult:
+    logger.warning(f"Request deadline of {deadline.budget:.1f}s reached, answering without the LLM")
+    trace.event("deadline_exceeded", provider=llm_name, budget=deadline.budget)
+    return FallbackResult(simple_fallback_response(user_input), "deadline")
+
+
 def get_cache_stats() -> Dict[str, Any]:
     """Get cache statistics for monitoring."""
     if not ENABLE_CACHING:
@@ -319,9 +757,9 @@ def get_cache_stats() -> Dict[str, Any]:
 
     now = time.time()
     valid_entries = sum(1 for data in _response_cache.values()
-                        if now - data['timestamp'] < CACHE_TTL)
+                        if now - data['timestamp'] < data.get('ttl', CACHE_TTL))
 
-    return {
+    stats = {
         "caching": "enabled",
         "total_entries": len(_response_cache),
         "valid_entries": valid_entries,
@@ -329,6 +767,14 @@ def get_cache_stats() -> Dict[str, Any]:
         "primary_llm": PRIMARY_LLM
     }
 
+    if _persistent_cache:
+        try:
+            stats["persistent"] = _persistent_cache.stats()
+        except Exception as e:
+            logger.warning(f"Failed to read persistent cache stats: {e}")
+
+    return stats
+
 
 # Alternative simple fallback function for emergencies
 def simple_fallback_response(user_input: str) -> str:
@@ -0,0 +1,159 @@
+import os
+import re
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+import numpy as np
+from langchain_core.messages import BaseMessage
+
+logger = logging.getLogger(__name__)
+
+# Routing configuration
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "true").lower() == "true"
+# Questions scoring at most this go to the fast tier
+ROUTING_FAST_MAX_SCORE = int(os.getenv("ROUTING_FAST_MAX_SCORE", "1"))
+ROUTING_LONG_QUESTION_WORDS = int(os.getenv("ROUTING_LONG_QUESTION_WORDS", "15"))
+ROUTING_LONG_HISTORY_MESSAGES = int(os.getenv("ROUTING_LONG_HISTORY_MESSAGES", "4"))
+# Scoring retrieval spread costs an extra query embedding and search per fast-eligible question,
+# on top of the chain's own retrieval, so it is off unless the embedding round trip is cheap
+ROUTING_USE_SCORE_SPREAD = os.getenv("ROUTING_USE_SCORE_SPREAD", "false").lower() == "true"
+# Top retrieval score minus the mean of the rest; below this the answer is spread over many chunks
+ROUTING_MIN_SCORE_SPREAD = float(os.getenv("ROUTING_MIN_SCORE_SPREAD", "0.05"))
+# Fast-tier answers shorter than this, or admitting they lack the information, are escalated
+ROUTING_MIN_ANSWER_CHARS = int(os.getenv("ROUTING_MIN_ANSWER_CHARS", "20"))
+
+_COMPLEX_PATTERNS = re.compile(
+    r"\b(compare|comparison|difference|differences|versus|vs\.?|explain|why|how does|how did|"
+    r"describe|summari[sz]e|walk me through|pros and cons|in detail|step by step)\b"
+)
+_QUESTION_WORDS = re.compile(r"\b(what|who|where|when|why|how|which|does|did|is|can)\b")
+_LOW_CONFIDENCE_PATTERNS = re.compile(
+    r"(don't have (that|this|any|enough) information|do not have (that|this|any|enough) information|"
+    r"i don't know|i'm not sure|i am not sure|not mentioned in the|no information (about|on))"
+)
+
+TIERS = ("fast", "large")
+
+
+@dataclass
+class RouteDecision:
+    """Model tier chosen for a question, with the signals behind it."""
+    tier: str
+    score: int
+    reasons: List[str] = field(default_factory=list)
+    score_spread: Optional[float] = None
+
+
+def retrieval_score_spread(retriever, question: str) -> Optional[float]:
+    """Top relevance score minus the mean of the others, or None if unavailable."""
+    vectorstore = getattr(retriever, "vectorstore", None)
+    if vectorstore is None:
+        return None
+    k = getattr(retriever, "search_kwargs", {}).get("k", 4)
+    try:
+        scores = [score for _, score in vectorstore.similarity_search_with_relevance_scores(question, k=k)]
+    except Exception as e:
+        logger.debug(f"Retrieval scores unavailable for routing: {e}")
+        return None
+    if len(scores) < 2:
+        return None
+    scores = sorted(scores, reverse=True)
+    return float(scores[0] - np.mean(scores[1:]))
+
+
+def classify_question(question: str, chat_history: List[BaseMessage], retriever=None) -> RouteDecision:
+    """
+    Score how hard a question is from cheap signals: its length, whether it
+    has several parts or asks for reasoning, and how much history it depends
+    on. With ROUTING_USE_SCORE_SPREAD, how spread out the retrieval scores
+    are counts too.
+    """
+    text = question.lower().strip()
+    score = 0
+    reasons = []
+
+    words = len(text.split())
+    if words > ROUTING_LONG_QUESTION_WORDS * 2:
+        score += 2
+        reasons.append("very_long_question")
+    elif words > ROUTING_LONG_QUESTION_WORDS:
+        score += 1
+        reasons.append("long_question")
+
+    if text.count("?") > 1 or len(_QUESTION_WORDS.findall(text)) > 2:
+        score += 2
+        reasons.append("multi_part")
+    if _COMPLEX_PATTERNS.search(text):
+        score += 2
+        reasons.append("reasoning")
+
+    if len(chat_history) > ROUTING_LONG_HISTORY_MESSAGES:
+        score += 1
+        reasons.append("long_history")
+
+    spread = None
+    # Only worth an extra retrieval when the text alone still allows the fast tier
+    if ROUTING_USE_SCORE_SPREAD and retriever is not None and score <= ROUTING_FAST_MAX_SCORE:
+        spread = retrieval_score_spread(retriever, question)
+        if spread is not None and spread < ROUTING_MIN_SCORE_SPREAD:
+            score += 1
+            reasons.append("scattered_context")
+
+    tier = "fast" if score <= ROUTING_FAST_MAX_SCORE else "large"
+    return RouteDecision(tier, score, reasons, spread)
+
+
+def is_low_confidence(answer: str) -> bool:
+    """Whether a fast-tier answer looks too weak to return without escalating."""
+    text = answer.strip().lower()
+    return len(text) < ROUTING_MIN_ANSWER_CHARS or bool(_LOW_CONFIDENCE_PATTERNS.search(text))
+
+
+class RoutingStats:
+    """Routing decisions, escalations and per-tier latency for monitoring."""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self.routed = {tier: 0 for tier in TIERS}
+        self.escalations = 0
+        self.reasons: Dict[str, int] = {}
+        self._latencies: Dict[str, Deque[float]] = {tier: deque(maxlen=window) for tier in TIERS}
+
+    def record_decision(self, decision: RouteDecision):
+        with self._lock:
+            self.routed[decision.tier] += 1
+            for reason in decision.reasons:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def record_escalation(self):
+        with self._lock:
+            self.escalations += 1
+
+    def record_latency(self, tier: str, seconds: float):
+        with self._lock:
+            self._latencies[tier].append(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latency = {}
+            for tier, samples in self._latencies.items():
+                values = np.array(samples)
+                latency[tier] = {
+                    "samples": len(values),
+                    "p50": round(float(np.percentile(values, 50)), 3) if len(values) else None,
+                    "p95": round(float(np.percentile(values, 95)), 3) if len(values) else None,
+                }
+            fast_total = self.routed["fast"]
+            return {
+                "enabled": ROUTING_ENABLED,
+                "routed": dict(self.routed),
+                "escalations": self.escalations,
+                "escalation_rate": round(self.escalations / fast_total, 3) if fast_total else 0.0,
+                "reasons": dict(self.reasons),
+                "latency": latency,
+            }
+
+
+routing_stats = RoutingStats()
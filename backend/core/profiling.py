@@ -0,0 +1,172 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Profiling configuration
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "nickberens_profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# Only stacks that pass through the backend package are recorded, which keeps
+# idle worker threads out of the profile
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROFILE_ID_RE = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of all threads at a fixed interval and
+    aggregates them as folded stacks ("frame;frame;frame count"), the input
+    format of flamegraph.pl, speedscope and similar tools.
+
+    Time spent waiting on the network shows up as samples ending in socket
+    or SSL frames under our own code.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._fold(frame)
+                if stack is None:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                self.stacks[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _fold(frame) -> Optional[str]:
+        frames = []
+        in_backend = False
+        while frame is not None:
+            code = frame.f_code
+            in_backend = in_backend or code.co_filename.startswith(BACKEND_DIR)
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if not in_backend:
+            return None
+        return ";".join(reversed(frames))
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Bounded on-disk ring of request profiles."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, folded: str, metadata: Dict[str, Any]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        metadata = {"id": profile_id, **metadata}
+
+        with open(os.path.join(self.directory, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+            f.write(folded)
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+
+        self._evict()
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        ids = [name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted(profile_id for profile_id in ids if _PROFILE_ID_RE.match(profile_id))
+
+    def _evict(self):
+        ids = self._ids()
+        for profile_id in ids[:max(0, len(ids) - self.max_files)]:
+            for ext in (".folded", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json"), "r", encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return profiles
+
+    def load(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class RequestProfiler:
+    """
+    Profiles one request at a time. Concurrent requests are not profiled
+    while a profile is in progress, and since the sampler sees every thread,
+    a profile may include work from requests that overlapped with it.
+    """
+
+    def __init__(self, store: ProfileStore, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.store = store
+        self.interval = interval_ms / 1000.0
+        self._busy = threading.Lock()
+
+    def try_start(self) -> Optional[StackSampler]:
+        if not self._busy.acquire(blocking=False):
+            return None
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler, metadata: Dict[str, Any]) -> Optional[str]:
+        try:
+            sampler.stop()
+            metadata = {**metadata, "samples": sampler.samples, "interval_ms": self.interval * 1000}
+            return self.store.save(sampler.folded(), metadata)
+        except Exception as e:
+            logger.error(f"Failed to save profile: {e}")
+            return None
+        finally:
+            self._busy.release()
+
+
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_MAX_FILES)
+request_profiler = RequestProfiler(profile_store)
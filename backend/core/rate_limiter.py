@@ -0,0 +1,203 @@
+import os
+import math
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Dict, Tuple
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration: "sqlite" shares buckets between all workers on the host,
+# "memory" keeps them per process (useful for tests and single-worker dev servers)
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "sqlite")
+RATE_LIMIT_DB_PATH = os.getenv(
+    "RATE_LIMIT_DB_PATH",
+    os.path.join(tempfile.gettempdir(), "nickberens_rate_limit.sqlite3")
+)
+
+# Bucket configuration: a client can burst up to CAPACITY tokens and regains
+# REFILL_PER_MINUTE tokens every minute
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", "5"))
+RATE_LIMIT_REFILL_PER_MINUTE = float(os.getenv("RATE_LIMIT_REFILL_PER_MINUTE", "5"))
+
+# Token cost per route. Only LLM calls spend the budget by default.
+ROUTE_COSTS: Dict[str, float] = {
+    "llm": float(os.getenv("RATE_LIMIT_COST_LLM", "1")),
+    "image_search": float(os.getenv("RATE_LIMIT_COST_IMAGE_SEARCH", "0")),
+    "cache": float(os.getenv("RATE_LIMIT_COST_CACHE", "0")),
+    "fact_index": float(os.getenv("RATE_LIMIT_COST_FACT_INDEX", "0")),
+}
+
+
+class RateLimitExceeded(HTTPException):
+    """Raised when a client's bucket cannot cover the cost of a request."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=429,
+            detail=f"Rate limit exceeded - please retry in {self.retry_after} seconds",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, refill_rate: float) -> float:
+    """Return the token count after refilling since the last update."""
+    elapsed = max(0.0, now - updated)
+    return min(capacity, tokens + elapsed * refill_rate)
+
+
+def _spend(tokens: float, cost: float, capacity: float, refill_rate: float) -> Tuple[bool, float, float]:
+    """
+    Try to spend cost tokens. Returns (allowed, tokens_left, retry_after).
+    A negative cost refunds tokens, up to capacity.
+    """
+    if tokens >= cost:
+        return True, min(capacity, tokens - cost), 0.0
+    retry_after = (cost - tokens) / refill_rate if refill_rate > 0 else float("inf")
+    return False, tokens, retry_after
+
+
+class MemoryBucketStore:
+    """In-process bucket store. Stand-in for tests and single-worker deployments."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, capacity: float, refill_rate: float) -> Tuple[bool, float, float]:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, refill_rate)
+            allowed, tokens, retry_after = _spend(tokens, cost, capacity, refill_rate)
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens, retry_after
+
+
+class SQLiteBucketStore:
+    """
+    Bucket store backed by a local SQLite file so every worker on the host
+    draws from the same buckets. Each take() runs in an immediate transaction,
+    which serializes concurrent updates across processes.
+    """
+
+    # Rows untouched for this long have fully refilled and can be dropped
+    PRUNE_AFTER_SECONDS = 3600
+    PRUNE_EVERY_N_CALLS = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, cost: float, capacity: float, refill_rate: float) -> Tuple[bool, float, float]:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = _refill(tokens, updated, now, capacity, refill_rate)
+            allowed, tokens, retry_after = _spend(tokens, cost, capacity, refill_rate)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY_N_CALLS == 0:
+            self._prune(now)
+
+        return allowed, tokens, retry_after
+
+    def _prune(self, now: float):
+        try:
+            self._connection().execute(
+                "DELETE FROM buckets WHERE updated < ?", (now - self.PRUNE_AFTER_SECONDS,)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to prune rate limit buckets: {e}")
+
+
+class TokenBucketLimiter:
+    """Token-bucket rate limiter with per-route costs."""
+
+    def __init__(self, store, capacity: float = RATE_LIMIT_CAPACITY,
+                 refill_per_minute: float = RATE_LIMIT_REFILL_PER_MINUTE,
+                 route_costs: Dict[str, float] = None):
+        self.store = store
+        self.capacity = capacity
+        self.refill_rate = refill_per_minute / 60.0
+        self.route_costs = dict(ROUTE_COSTS if route_costs is None else route_costs)
+
+    def check(self, key: str, route: str) -> float:
+        """
+        Charge the cost of a route to the client's bucket.
+
+        Returns the number of tokens left, or raises RateLimitExceeded with an
+        accurate retry delay when the bucket cannot cover the cost.
+        """
+        cost = min(self.route_costs.get(route, 1.0), self.capacity)
+        if cost <= 0:
+            return self.capacity
+
+        try:
+            allowed, remaining, retry_after = self.store.take(
+                key, cost, self.capacity, self.refill_rate
+            )
+        except Exception as e:
+            # Fail open: a broken limiter store must not take the API down
+            logger.error(f"Rate limiter storage error: {e}")
+            return self.capacity
+
+        if not allowed:
+            logger.info(f"Rate limit exceeded for {key} on {route} route (retry in {retry_after:.1f}s)")
+            raise RateLimitExceeded(retry_after)
+        return remaining
+
+    def refund(self, key: str, route: str):
+        """Give back the cost charged by check(), for a request that was shed before doing the work."""
+        cost = min(self.route_costs.get(route, 1.0), self.capacity)
+        if cost <= 0:
+            return
+
+        try:
+            self.store.take(key, -cost, self.capacity, self.refill_rate)
+        except Exception as e:
+            logger.error(f"Rate limiter storage error: {e}")
+
+
+def create_limiter() -> TokenBucketLimiter:
+    """Create the limiter using the configured storage backend."""
+    if RATE_LIMIT_STORAGE.lower() == "sqlite":
+        try:
+            store = SQLiteBucketStore(RATE_LIMIT_DB_PATH)
+            logger.info(f"Rate limiter using shared SQLite store at {RATE_LIMIT_DB_PATH}")
+            return TokenBucketLimiter(store)
+        except Exception as e:
+            logger.warning(f"Could not open SQLite rate limit store, using in-memory buckets: {e}")
+
+    return TokenBucketLimiter(MemoryBucketStore())
@@ -0,0 +1,102 @@
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteResponseStore:
+    """
+    Persistent response cache in a local SQLite file.
+
+    Shared by every worker on the host and survives restarts, so a cache
+    warmed before a deploy is hot for the first visitor. Expired rows are
+    deleted when read and pruned periodically, and the newest max_entries
+    rows are kept.
+    """
+
+    PRUNE_EVERY_N_SETS = 100
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "timestamp REAL NOT NULL, ttl REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_timestamp ON responses (timestamp)")
+        self._prune(time.time())
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The entry for key, or None if it is missing or expired."""
+        row = self._connection().execute(
+            "SELECT response, timestamp, ttl FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        if time.time() - row[1] >= row[2]:
+            self.delete(key)
+            return None
+        return {"response": row[0], "timestamp": row[1], "ttl": row[2]}
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO responses (key, response, timestamp, ttl) VALUES (?, ?, ?, ?)",
+            (key, entry["response"], entry["timestamp"], entry["ttl"])
+        )
+
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY_N_SETS == 0:
+            self._prune(time.time())
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _prune(self, now: float):
+        """Drop expired rows, then the oldest rows beyond max_entries."""
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses WHERE ? - timestamp >= ttl", (now,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY timestamp DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to prune response cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        total, valid = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(CASE WHEN ? - timestamp < ttl THEN 1 ELSE 0 END), 0) "
+            "FROM responses", (now,)
+        ).fetchone()
+        return {"total_entries": total, "valid_entries": valid, "max_entries": self.max_entries}
+
+
+def create_response_store(path: Optional[str], max_entries: int = 5000) -> Optional[SQLiteResponseStore]:
+    """Open the persistent response store, or return None if not configured."""
+    if not path:
+        return None
+
+    try:
+        store = SQLiteResponseStore(path, max_entries)
+        logger.info(f"Persistent response cache at {path}")
+        return store
+    except Exception as e:
+        logger.warning(f"Could not open persistent response cache at {path}: {e}")
+        return None
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import sqlite3
+import secrets
+import logging
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, messages_from_dict, messages_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Session configuration
+SESSION_TTL = int(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+# Messages kept per session (a question and its answer are two messages)
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+# Storage: "sqlite" shares sessions between all workers on the host, so any worker
+# can continue a conversation; "memory" keeps them per process (tests, single worker)
+SESSION_STORAGE = os.getenv("SESSION_STORAGE", "sqlite")
+SESSION_DB_PATH = os.getenv(
+    "SESSION_DB_PATH",
+    os.path.join(tempfile.gettempdir(), "nickberens_sessions.sqlite3")
+)
+
+
+class _Session:
+    def __init__(self, max_messages: int):
+        self.messages: Deque[BaseMessage] = deque(maxlen=max_messages)
+        self.last_used = time.time()
+
+
+class SessionStore:
+    """
+    Bounded server-side chat histories, so clients send only the new message.
+
+    Sessions expire after ttl seconds of inactivity, and the least recently
+    used session is evicted once max_sessions is reached. Each session keeps
+    its last max_messages messages. Sessions live in this worker's memory,
+    so with several workers use SQLiteSessionStore instead. A session can
+    still disappear (expiry, eviction, restart); callers report that to the
+    client, which then resends its own history.
+    """
+
+    def __init__(self, ttl: int = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_messages = max(2, max_messages)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired_total = 0
+        self.evicted_total = 0
+
+    def _prune(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.ttl:
+                break
+            del self._sessions[session_id]
+            self.expired_total += 1
+
+    def create(self, history: Optional[List[BaseMessage]] = None) -> str:
+        """Start a session, optionally seeded with an existing history."""
+        session_id = secrets.token_urlsafe(16)
+        session = _Session(self.max_messages)
+        session.messages.extend(history or [])
+
+        with self._lock:
+            self._prune(session.last_used)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_total += 1
+            self._sessions[session_id] = session
+        return session_id
+
+    def get_history(self, session_id: Optional[str]) -> Optional[List[BaseMessage]]:
+        """History of a live session, or None if it is unknown or expired."""
+        if not session_id:
+            return None
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return list(session.messages)
+
+    def restore(self, session_id: str, history: List[BaseMessage]) -> bool:
+        """Seed a session that has no messages yet, e.g. after the client's old one expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.messages:
+                return False
+            session.messages.extend(history)
+            return True
+
+    def append(self, session_id: str, question: str, answer: str):
+        """Record one turn; the oldest messages drop off past max_messages."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.messages.append(HumanMessage(content=question))
+            session.messages.append(AIMessage(content=answer))
+            session.last_used = time.time()
+            self._sessions.move_to_end(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.time())
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_messages": self.max_messages,
+                "ttl": self.ttl,
+                "expired_total": self.expired_total,
+                "evicted_total": self.evicted_total,
+            }
+
+
+class SQLiteSessionStore:
+    """
+    Session store backed by a local SQLite file, so every worker on the host
+    sees the same sessions and a load balancer can send each turn anywhere.
+    Same interface and limits as SessionStore; updates run in immediate
+    transactions, which serializes concurrent turns across processes.
+    """
+
+    def __init__(self, path: str, ttl: int = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_messages = max(2, max_messages)
+        self._local = threading.local()
+        # Counted by this process only
+        self.expired_total = 0
+        self.evicted_total = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, messages TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _dump(self, messages: List[BaseMessage]) -> str:
+        return json.dumps(messages_to_dict(messages[-self.max_messages:]))
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        self.expired_total += conn.execute(
+            "DELETE FROM sessions WHERE last_used <= ?", (now - self.ttl,)
+        ).rowcount
+        # Make room for one more session, dropping the least recently used
+        self.evicted_total += conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            "SELECT id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions - 1,)
+        ).rowcount
+
+    def _load(self, conn: sqlite3.Connection, session_id: str, now: float) -> Optional[List[BaseMessage]]:
+        row = conn.execute(
+            "SELECT messages, last_used FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] >= self.ttl:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.expired_total += 1
+            return None
+        return messages_from_dict(json.loads(row[0]))
+
+    def _transaction(self, fn):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, time.time())
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def create(self, history: Optional[List[BaseMessage]] = None) -> str:
+        """Start a session, optionally seeded with an existing history."""
+        session_id = secrets.token_urlsafe(16)
+
+        def insert(conn, now):
+            self._prune(conn, now)
+            conn.execute(
+                "INSERT INTO sessions (id, messages, last_used) VALUES (?, ?, ?)",
+                (session_id, self._dump(list(history or [])), now)
+            )
+        self._transaction(insert)
+        return session_id
+
+    def get_history(self, session_id: Optional[str]) -> Optional[List[BaseMessage]]:
+        """History of a live session, or None if it is unknown or expired."""
+        if not session_id:
+            return None
+
+        def touch(conn, now):
+            messages = self._load(conn, session_id, now)
+            if messages is not None:
+                conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+            return messages
+        return self._transaction(touch)
+
+    def restore(self, session_id: str, history: List[BaseMessage]) -> bool:
+        """Seed a session that has no messages yet, e.g. after the client's old one expired."""
+        def seed(conn, now):
+            messages = self._load(conn, session_id, now)
+            if messages is None or messages:
+                return False
+            conn.execute("UPDATE sessions SET messages = ? WHERE id = ?", (self._dump(history), session_id))
+            return True
+        return self._transaction(seed)
+
+    def append(self, session_id: str, question: str, answer: str):
+        """Record one turn; the oldest messages drop off past max_messages."""
+        def add(conn, now):
+            messages = self._load(conn, session_id, now)
+            if messages is None:
+                return
+            messages += [HumanMessage(content=question), AIMessage(content=answer)]
+            conn.execute(
+                "UPDATE sessions SET messages = ?, last_used = ? WHERE id = ?",
+                (self._dump(messages), now, session_id)
+            )
+        self._transaction(add)
+
+    def delete(self, session_id: str) -> bool:
+        return self._connection().execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def stats(self) -> Dict[str, Any]:
+        (active,) = self._connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_used > ?", (time.time() - self.ttl,)
+        ).fetchone()
+        return {
+            "active_sessions": active,
+            "max_sessions": self.max_sessions,
+            "max_messages": self.max_messages,
+            "ttl": self.ttl,
+            "expired_total": self.expired_total,
+            "evicted_total": self.evicted_total,
+        }
+
+
+def create_session_store():
+    """Create the session store using the configured storage backend."""
+    if SESSION_STORAGE.lower() == "sqlite":
+        try:
+            store = SQLiteSessionStore(SESSION_DB_PATH)
+            logger.info(f"Sessions shared through SQLite store at {SESSION_DB_PATH}")
+            return store
+        except Exception as e:
+            logger.warning(f"Could not open SQLite session store, keeping sessions per worker: {e}")
+
+    return SessionStore()
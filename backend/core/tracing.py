@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Tracing configuration
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+# When set, finished traces are appended here as OTLP/JSON, one export request per line
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+SERVICE_NAME = os.getenv("SERVICE_NAME", "nickberens-portfolio-api")
+
+_traces: Deque["Trace"] = deque(maxlen=TRACE_BUFFER_SIZE)
+_traces_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.end = time.time()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) * 1000, 2) if self.end else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Span tree for one request, plus the decisions taken along the way."""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(name, "request", attributes=attributes)
+        self.spans: List[Span] = [self.root]
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        span = Span(name, kind, parent or self.root, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None):
+        span = self.start_span(name, kind, attributes=attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(e)
+            raise
+        else:
+            span.finish()
+
+    def event(self, name: str, **attributes):
+        """Record a decision, such as a cache hit, retry or provider fallback."""
+        with self._lock:
+            self.events.append({"name": name, "time": time.time(), **attributes})
+
+    def callbacks(self, parent: Span) -> List[BaseCallbackHandler]:
+        """LangChain callbacks that record chain runs as children of parent."""
+        return [TraceCallbackHandler(self, parent)] if TRACING_ENABLED else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start": self.root.start,
+            "duration_ms": self.root.to_dict()["duration_ms"],
+            "attributes": self.root.attributes,
+            "events": list(self.events),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain chain, LLM and retriever runs into spans."""
+
+    def __init__(self, trace: Trace, parent: Span):
+        self.trace = trace
+        self.parent = parent
+        self._runs: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str,
+               attributes: Optional[Dict[str, Any]] = None) -> Span:
+        with self._lock:
+            parent = self._runs.get(parent_run_id, self.parent)
+        span = self.trace.start_span(name, kind, parent, attributes)
+        with self._lock:
+            self._runs[run_id] = span
+        return span
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        with self._lock:
+            span = self._runs.pop(run_id, None)
+        if span:
+            span.finish(error)
+        return span
+
+    @staticmethod
+    def _name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+        return kwargs.get("name") or (serialized or {}).get("name") or default
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def _start_llm(self, serialized, run_id, parent_run_id, kwargs):
+        metadata = kwargs.get("metadata") or {}
+        params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or params.get("model") or params.get("model_name")
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), "llm", {"model": model})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if not span:
+            return
+
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        span.attributes["input_tokens"] = input_tokens
+        span.attributes["output_tokens"] = output_tokens
+
+        llm_output = response.llm_output or {}
+        if not span.attributes.get("model"):
+            span.attributes["model"] = llm_output.get("model") or llm_output.get("model_name")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "retriever"), "retriever",
+                    {"query": query})
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span:
+            span.attributes["doc_ids"] = [
+                doc.metadata.get("chunk_id") or getattr(doc, "id", None) for doc in documents
+            ]
+            span.attributes["sources"] = sorted({str(doc.metadata.get("source")) for doc in documents})
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+def start_trace(name: str, **attributes) -> Trace:
+    """
+    Start a trace. When tracing is disabled the trace is still usable but
+    attaches no LangChain callbacks and is not recorded.
+    """
+    return Trace(name, attributes)
+
+
+def finish_trace(trace: Trace, **attributes):
+    """Close a trace, keep it in the ring buffer and export it if configured."""
+    trace.root.attributes.update(attributes)
+    trace.root.finish()
+    if not TRACING_ENABLED:
+        return
+
+    with _traces_lock:
+        _traces.append(trace)
+
+    if TRACE_EXPORT_PATH:
+        try:
+            line = json.dumps(to_otlp(trace))
+            with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            logger.warning(f"Failed to export trace {trace.trace_id}: {e}")
+
+
+def get_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent traces, newest first."""
+    with _traces_lock:
+        recent = list(_traces)[-limit:] if limit > 0 else []
+    return [trace.to_dict() for trace in reversed(recent)]
+
+
+def get_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    with _traces_lock:
+        for trace in _traces:
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+    return None
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """Convert a trace to an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for span in trace.spans:
+        end = span.end or time.time()
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 2 if span is trace.root else 1,
+            "startTimeUnixNano": str(int(span.start * 1e9)),
+            "endTimeUnixNano": str(int(end * 1e9)),
+            "attributes": _otlp_attributes({"kind": span.kind, **span.attributes}),
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        if span is trace.root:
+            otlp_span["events"] = [
+                {
+                    "timeUnixNano": str(int(event["time"] * 1e9)),
+                    "name": event["name"],
+                    "attributes": _otlp_attributes(
+                        {k: v for k, v in event.items() if k not in ("name", "time")}
+                    ),
+                }
+                for event in trace.events
+            ]
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
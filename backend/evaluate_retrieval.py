@@ -0,0 +1,183 @@
+"""
+Retrieval evaluation harness.
+
+Builds retrievers for a sweep of chunking strategies, chunk sizes, overlaps,
+vector store backends and k, then runs a golden question set against each
+and prints recall@k, MRR, context size, index build time and per-query
+retrieval latency side by side.
+
+A retrieved chunk counts as relevant when it contains one of the question's
+expected passages (case and whitespace are ignored). By default a local
+hashing embedder stands in for the Google embeddings, so the sweep is
+deterministic and needs no network; absolute scores are lower than with
+the real model, but configurations stay comparable.
+
+Usage (from the repository root):
+    python -m backend.evaluate_retrieval [--chunk-sizes 500,1000] [--k 2,4,6] [--embeddings google]
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import logging
+from typing import Any, Dict, List
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+from .core.data_loader import load_all_documents
+from .core.llm_chain import create_full_retrieval_chain, CHUNK_SIZE, CHUNK_OVERLAP, RETRIEVER_K
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "eval_questions.json")
+# Rough token estimate for context size; close enough to compare configurations
+CHARS_PER_TOKEN = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings using the hashing trick.
+
+    Words and word bigrams are hashed into a fixed number of signed buckets
+    and the vector is L2-normalized, so texts sharing vocabulary score high.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        words = _TOKEN_RE.findall(text.lower())
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def read_golden_set(path: str) -> List[Dict[str, Any]]:
+    """Read questions with the passages a good retrieval must return."""
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    for item in questions:
+        item["expected"] = [normalize(passage) for passage in item["expected"]]
+    return questions
+
+
+def parse_list(value: str, cast=str) -> List[Any]:
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def evaluate(retriever, golden_set: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Run every golden question and aggregate the retrieval metrics."""
+    recalls, reciprocal_ranks, context_tokens, latencies = [], [], [], []
+
+    for item in golden_set:
+        start_time = time.perf_counter()
+        docs = retriever.invoke(item["question"])
+        latencies.append(time.perf_counter() - start_time)
+
+        chunks = [normalize(doc.page_content) for doc in docs]
+        found = [passage for passage in item["expected"] if any(passage in chunk for chunk in chunks)]
+        recalls.append(len(found) / len(item["expected"]))
+
+        rank = next(
+            (i for i, chunk in enumerate(chunks, 1) if any(passage in chunk for passage in item["expected"])),
+            None
+        )
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        context_tokens.append(sum(len(doc.page_content) for doc in docs) / CHARS_PER_TOKEN)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "context_tokens": float(np.mean(context_tokens)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare retrieval settings on a golden question set.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS_PATH, help="Golden question set (JSON)")
+    parser.add_argument("--strategies", default="structure,recursive", help="Chunking strategies to compare")
+    parser.add_argument("--chunk-sizes", default=f"500,{CHUNK_SIZE}", help="Chunk sizes in characters")
+    parser.add_argument("--overlaps", default=f"0,{CHUNK_OVERLAP}", help="Chunk overlaps in characters")
+    parser.add_argument("--backends", default="flat,chroma", help="Vector store backends to compare")
+    parser.add_argument("--k", default=f"2,{RETRIEVER_K},6", help="Chunks retrieved per question")
+    parser.add_argument("--embeddings", choices=["hashing", "google"], default="hashing",
+                        help="Local deterministic embeddings, or the configured Google model (needs network)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    golden_set = read_golden_set(args.questions)
+    docs = load_all_documents()
+    embeddings = HashingEmbeddings() if args.embeddings == "hashing" else None
+    k_values = sorted(set(parse_list(args.k, int)))
+
+    results = []
+    configs = itertools.product(
+        parse_list(args.strategies), parse_list(args.chunk_sizes, int),
+        parse_list(args.overlaps, int), parse_list(args.backends)
+    )
+    for index, (strategy, chunk_size, overlap, backend) in enumerate(configs):
+        if overlap >= chunk_size:
+            continue
+
+        start_time = time.perf_counter()
+        retriever = create_full_retrieval_chain(
+            docs, embeddings=embeddings, strategy=strategy, chunk_size=chunk_size,
+            chunk_overlap=overlap, backend=backend, persist=False, collection_name=f"eval_{index}"
+        )
+        build_time = time.perf_counter() - start_time
+        chunk_count = len(retriever.vectorstore.get(include=[])["ids"])
+
+        for k in k_values:
+            retriever.search_kwargs["k"] = k
+            results.append({
+                "strategy": strategy, "chunk_size": chunk_size, "overlap": overlap, "backend": backend,
+                "k": k, "chunks": chunk_count, "build_s": build_time,
+                **evaluate(retriever, golden_set),
+            })
+
+    print(f"{'strategy':<10} {'size':>5} {'overlap':>7} {'backend':<7} {'k':>2} {'chunks':>6} "
+          f"{'recall@k':>8} {'MRR':>5} {'ctx tok':>7} {'build s':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for row in results:
+        print(f"{row['strategy']:<10} {row['chunk_size']:>5} {row['overlap']:>7} {row['backend']:<7} "
+              f"{row['k']:>2} {row['chunks']:>6} {row['recall']:>8.2f} {row['mrr']:>5.2f} "
+              f"{row['context_tokens']:>7.0f} {row['build_s']:>7.2f} {row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    print(f"\nEvaluated {len(results)} configurations on {len(golden_set)} questions "
+          f"({args.embeddings} embeddings)")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,26 +2,43 @@ import os
 import glob
 import json
 import re
+import hashlib
+import asyncio
+import random
+import secrets
 import logging
 import time
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, Request, HTTPException
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import FastAPI, Request, HTTPException, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Import the fuzzy matching library
 from thefuzz import process
 
-# Import rate limiting components
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-
 # Import your custom modules
 from .core.data_loader import load_all_documents
-from .core.llm_chain import create_full_retrieval_chain, invoke_with_fallback
-from langchain_core.messages import HumanMessage, AIMessage
+from .core.llm_chain import (
+    create_full_retrieval_chain, invoke_with_fallback_result, get_cache_key, get_cached_response,
+    index_is_prebuilt, refresh_index, simple_fallback_response, stream_with_fallback
+)
+from .core.rate_limiter import create_limiter
+from .core.admission import AdmissionController
+from .core.deadline import Deadline, DEADLINE_HEADER
+from .core.sessions import create_session_store
+from .core.model_router import routing_stats
+from .core.fact_index import FactIndex
+from .core.profiling import (
+    PROFILING_ENABLED, PROFILE_SAMPLE_RATE, profile_store, request_profiler
+)
+from .core.tracing import get_traces, get_trace
+from .core.http_cache import (
+    make_etag, etag_matches, not_modified_response, cacheable_json_response
+)
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 
 # Load environment variables
 load_dotenv()
@@ -38,10 +55,42 @@ logger = logging.getLogger(__name__)
 SEARCH_THRESHOLD = int(os.getenv("SEARCH_THRESHOLD", "55"))
 MAX_RESULTS = int(os.getenv("MAX_RESULTS", "15"))
 ILLUSTRATIONS_PATH = os.getenv("ILLUSTRATIONS_PATH", "public/illustrations.json")
+# Manifest written by build_image_derivatives.py
+ILLUSTRATION_DERIVATIVES_PATH = os.getenv(
+    "ILLUSTRATION_DERIVATIVES_PATH", "public/illustrations-derivatives.json"
+)
 PRIMARY_LLM = os.getenv("PRIMARY_LLM", "claude")
+ILLUSTRATIONS_CACHE_CONTROL = os.getenv(
+    "ILLUSTRATIONS_CACHE_CONTROL",
+    "public, max-age=300, s-maxage=86400, stale-while-revalidate=86400"
+)
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 # --- Setup Rate Limiter ---
-limiter = Limiter(key_func=get_remote_address)
+# Token buckets shared by all workers; only the LLM path is charged by default
+limiter = create_limiter()
+admission = AdmissionController()
+sessions = create_session_store()
+fact_index = FactIndex()
+
+
+def get_client_key(request: Request) -> str:
+    """Identify the client for rate limiting."""
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def is_admin(request: Request) -> bool:
+    """Check whether the request carries the configured admin token."""
+    token = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and secrets.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(request: Request):
+    """Reject requests that don't carry the configured admin token."""
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
 
 # --- Setup Application ---
 app = FastAPI(
@@ -50,7 +99,6 @@ app = FastAPI(
     version="2.0.0"
 )
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
 # Add request timing middleware
@@ -70,6 +118,38 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+# On-demand profiling. The middleware is only installed when PROFILING_ENABLED
+# is set, so there is no per-request cost otherwise.
+if PROFILING_ENABLED:
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        requested = "x-profile" in request.headers and is_admin(request)
+        sampled = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        sampler = request_profiler.try_start() if (requested or sampled) else None
+        if sampler is None:
+            return await call_next(request)
+
+        start_time = time.time()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Always stop the sampler, or a failed request would leave it running
+            # and keep this worker from profiling again
+            profile_id = request_profiler.finish(sampler, {
+                "method": request.method,
+                "path": request.url.path,
+                "status": status,
+                "duration": round(time.time() - start_time, 4),
+                "timestamp": start_time,
+                "trigger": "header" if requested else "sampled",
+            })
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+
 class Message(BaseModel):
     sender: str = Field(..., description="Either 'user' or 'assistant'")
     text: str = Field(..., description="The message content")
@@ -78,31 +158,68 @@ class Message(BaseModel):
 class Query(BaseModel):
     question: str = Field(..., min_length=1, description="The user's question")
     chat_history: List[Message] = Field(default=[], description="Previous conversation history")
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Server-side session to continue instead of sending chat_history. Send an empty string "
+                    "to start one. An unknown or expired session is restarted from chat_history, or answered "
+                    "with 409 when chat_history is empty so the client can resend it."
+    )
 
 
 class QueryResponse(BaseModel):
     answer: str
     images: Optional[List[str]] = None
+    # Dimensions, placeholder and responsive variants for each entry in images
+    image_details: Optional[List[Dict[str, Any]]] = None
     processing_time: Optional[float] = None
     llm_used: Optional[str] = None
+    session_id: Optional[str] = None
+    # Documents and sections an extractive answer was taken from
+    sources: Optional[List[str]] = None
 
 
-def load_illustrations() -> List[Dict[str, Any]]:
-    """Load illustrations data from JSON file with error handling."""
+def load_illustrations() -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Load illustrations data from JSON file with error handling.
+
+    Returns the catalog together with its version, a hash of the file contents
+    used to validate cached search responses.
+    """
     try:
-        with open(ILLUSTRATIONS_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            logger.info(f"Loaded {len(data)} illustrations")
-            return data
+        with open(ILLUSTRATIONS_PATH, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw.decode("utf-8"))
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        logger.info(f"Loaded {len(data)} illustrations (catalog version {version})")
+        return data, version
     except FileNotFoundError:
         logger.warning(f"Illustrations file not found at {ILLUSTRATIONS_PATH}")
-        return []
+        return [], "empty"
     except json.JSONDecodeError as e:
         logger.error(f"Invalid JSON in illustrations file: {e}")
-        return []
+        return [], "empty"
     except Exception as e:
         logger.error(f"Unexpected error loading illustrations: {e}")
-        return []
+        return [], "empty"
+
+
+def load_image_derivatives() -> Tuple[Dict[str, Dict[str, Any]], str]:
+    """Load the responsive image manifest, keyed by illustration file."""
+    try:
+        with open(ILLUSTRATION_DERIVATIVES_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        images = manifest.get("images", {})
+        logger.info(f"Loaded image derivatives for {len(images)} illustrations")
+        return images, manifest.get("version", "unknown")
+    except FileNotFoundError:
+        logger.warning(
+            f"No image derivatives manifest at {ILLUSTRATION_DERIVATIVES_PATH}; serving originals only. "
+            f"Run python -m backend.build_image_derivatives as part of the API build."
+        )
+        return {}, "none"
+    except Exception as e:
+        logger.error(f"Failed to load image derivatives manifest: {e}")
+        return {}, "none"
 
 
 def initialize_app_state():
@@ -115,14 +232,17 @@ def initialize_app_state():
         all_docs = load_all_documents()
         logger.info(f"Loaded {len(all_docs)} documents")
 
+        # Built before the retriever so factual lookups still work if embedding fails
+        fact_index.build(all_docs)
+
         logger.info("Creating retrieval chain...")
         retriever = create_full_retrieval_chain(all_docs)
 
         logger.info("Loading illustrations...")
-        illustrations_data = load_illustrations()
+        illustrations_data, illustrations_version = load_illustrations()
 
         logger.info("Application initialization complete")
-        return retriever, illustrations_data
+        return retriever, illustrations_data, illustrations_version
     except Exception as e:
         logger.error(f"Failed to initialize app state: {e}")
         raise
@@ -130,13 +250,17 @@ def initialize_app_state():
 
 # Initialize app state
 try:
-    retriever, illustrations_data = initialize_app_state()
+    retriever, illustrations_data, illustrations_version = initialize_app_state()
     app_initialized = True
 except Exception as e:
     logger.critical(f"Application startup failed: {e}")
-    retriever, illustrations_data = None, []
+    # Image search does not depend on the LLM stack, so keep serving it
+    retriever = None
+    illustrations_data, illustrations_version = load_illustrations()
     app_initialized = False
 
+image_derivatives, image_derivatives_version = load_image_derivatives()
+
 origins = [
     "http://localhost:4321",                  # Local development
     "http://localhost:3000",                  # Other local ports
@@ -223,6 +347,21 @@ def search_illustrations(search_term: str) -> List[Dict[str, str]]:
         return []
 
 
+def describe_images(found_images: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Original URL plus responsive derivative metadata for each found image."""
+    details = []
+    for img in found_images:
+        derivative = image_derivatives.get(img["file"], {})
+        details.append({
+            "url": f"/illustrations/{img['file']}",
+            "width": derivative.get("width"),
+            "height": derivative.get("height"),
+            "placeholder": derivative.get("placeholder"),
+            "variants": derivative.get("variants", []),
+        })
+    return details
+
+
 # --- API Endpoints ---
 
 @app.get("/")
@@ -245,7 +384,12 @@ async def health_check():
         "components": {
             "retriever": retriever is not None,
             "illustrations": len(illustrations_data) > 0,
-            "illustrations_count": len(illustrations_data)
+            "illustrations_count": len(illustrations_data),
+            "active_sessions": sessions.stats()["active_sessions"]
+        },
+        "admission": {
+            "in_flight": admission.in_flight,
+            "queue_depth": admission.waiting
         },
         "configuration": {
             "primary_llm": PRIMARY_LLM,
@@ -279,6 +423,24 @@ async def cache_stats():
         return {"error": "Unable to retrieve cache stats"}
 
 
+@app.get("/admission-stats")
+async def admission_stats():
+    """Get LLM admission control statistics for monitoring."""
+    return admission.get_stats()
+
+
+@app.get("/routing-stats")
+async def routing_stats_endpoint():
+    """Get model routing decisions and per-tier latency for monitoring."""
+    return routing_stats.get_stats()
+
+
+@app.get("/fact-stats")
+async def fact_stats():
+    """Get fact index contents and hit rate for monitoring."""
+    return fact_index.get_stats()
+
+
 @app.get("/llm-status")
 async def llm_status():
     """Check LLM service status."""
@@ -291,7 +453,9 @@ async def llm_status():
             "gemini_available": llms.get('gemini') is not None,
             "models": {
                 "claude": os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022"),
-                "gemini": os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+                "gemini": os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
+                "claude_fast": os.getenv("CLAUDE_FAST_MODEL", "claude-3-5-haiku-20241022"),
+                "gemini_fast": os.getenv("GEMINI_FAST_MODEL", "gemini-1.5-flash-8b")
             }
         }
     except Exception as e:
@@ -299,8 +463,317 @@ async def llm_status():
         return {"error": "Unable to check LLM status", "detail": str(e)}
 
 
+@app.post("/admin/reindex")
+async def reindex(request: Request):
+    """
+    Reload source documents and re-embed only the chunks that changed.
+
+    Only the worker handling this request is updated (its vector store and
+    fact index); other workers pick up the new content when they restart,
+    so with several workers, redeploy or restart them all. Answers cached
+    by other workers stay keyed to their own index version. A persistent
+    Chroma collection is only written by the build_index command, so it
+    can't be re-indexed here.
+    """
+    require_admin(request)
+
+    if not retriever:
+        raise HTTPException(status_code=503, detail="Retriever not initialized")
+    if index_is_prebuilt():
+        raise HTTPException(
+            status_code=409,
+            detail="The index is prebuilt - run python -m backend.build_index and restart the workers"
+        )
+
+    try:
+        docs = await run_in_threadpool(load_all_documents)
+        fact_index.build(docs)
+        report = await run_in_threadpool(refresh_index, retriever, docs)
+        return {**report, "worker_pid": os.getpid()}
+    except Exception as e:
+        logger.error(f"Re-indexing failed: {e}")
+        raise HTTPException(status_code=500, detail="Re-indexing failed")
+
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """List captured request profiles, newest first."""
+    require_admin(request)
+    return {"enabled": PROFILING_ENABLED, "profiles": profile_store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(request: Request, profile_id: str):
+    """Download a profile as folded stacks for flamegraph.pl or speedscope."""
+    require_admin(request)
+    folded = profile_store.load(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+    )
+
+
+@app.get("/debug/traces")
+async def debug_traces(request: Request, limit: int = 20):
+    """Recent RAG traces (span trees with timings, tokens and decisions), newest first."""
+    require_admin(request)
+    return {"traces": get_traces(limit)}
+
+
+@app.get("/debug/traces/{trace_id}")
+async def debug_trace(request: Request, trace_id: str):
+    """A single trace by ID."""
+    require_admin(request)
+    trace = get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+
+@app.get("/illustrations/search")
+async def illustrations_search(request: Request, q: str = "") -> Response:
+    """
+    Cacheable illustration search.
+
+    Returns the same matches as the image routes of /query, plus metadata. The
+    response is a pure function of the search term and the illustrations
+    catalog, so it carries an ETag derived from the catalog version and a
+    Cache-Control policy that lets browsers and the CDN serve repeat searches.
+    """
+    search_term = q.strip()
+    etag = make_etag(
+        illustrations_version, image_derivatives_version, SEARCH_THRESHOLD, MAX_RESULTS, search_term.lower()
+    )
+    headers = {"ETag": etag, "Cache-Control": ILLUSTRATIONS_CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        return not_modified_response(headers)
+
+    limiter.check(get_client_key(request), "image_search")
+
+    catalog = {img["file"]: img for img in illustrations_data if isinstance(img, dict) and "file" in img}
+    results = []
+    matches = search_illustrations(search_term)
+    for match, details in zip(matches, describe_images(matches)):
+        img = catalog.get(match["file"], {})
+        results.append({
+            "file": match["file"],
+            "title": img.get("title"),
+            "tags": img.get("tags", []),
+            **details,
+        })
+
+    payload = {
+        "query": search_term,
+        "count": len(results),
+        "results": results,
+        "catalog_version": illustrations_version,
+    }
+    return cacheable_json_response(request, payload, headers)
+
+
+def format_chat_history(messages: List[Message]) -> List[BaseMessage]:
+    """Convert client chat messages to LangChain messages."""
+    formatted_chat_history = []
+    for message in messages:
+        if message.sender == 'user':
+            formatted_chat_history.append(HumanMessage(content=message.text))
+        elif message.sender in ['assistant', 'ai', 'bot']:
+            formatted_chat_history.append(AIMessage(content=message.text))
+    return formatted_chat_history
+
+
+def degraded_answer(question: str, cache_key: Optional[str]) -> Tuple[str, str]:
+    """
+    Fast answer for a request shed by admission control, and its llm_used label.
+    Another request may have cached this answer while we waited.
+    """
+    cached_answer = get_cached_response(cache_key)
+    if cached_answer:
+        return cached_answer, "degraded_cache"
+    return simple_fallback_response(question), "degraded_keyword"
+
+
+def route_image_query(question: str, client_key: str, start_time: float) -> Optional[QueryResponse]:
+    """
+    Answer illustration requests directly from the illustration index.
+
+    question is the lowercased, stripped user question. Returns None when the
+    question isn't asking for images.
+    """
+    # Define image-related keywords that indicate user wants illustrations
+    image_keywords = [
+        "image", "images", "illustration", "illustrations", "drawing", "drawings",
+        "art", "design", "designs", "pic", "pics", "picture", "pictures"
+    ]
+
+    # Define search patterns
+    specific_image_keywords = [
+        "images of", "image of", "drawings of", "drawing of",
+        "illustrations of", "illustration of", "art about", "art of"
+    ]
+
+    # Enhanced image search patterns
+    show_me_patterns = [
+        "show me", "show", "find", "get", "display"
+    ]
+
+    image_indicators = [
+        "images", "image", "illustrations", "illustration", "drawings", "drawing", "art", "pics", "pictures"
+    ]
+
+    # Words to ignore when building search terms
+    ignore_words = {
+        "show", "me", "get", "find", "display", "see", "view", "look", "at",
+        "the", "a", "an", "some", "any", "all", "your", "of", "for"
+    }
+
+    # Special phrases for showing all images
+    all_image_phrases = [
+        "show me all illustrations", "show all illustrations", "show me your illustrations",
+        "show me all your art", "show me all images", "show me images", "show your art",
+        "all images", "all illustrations", "all art", "show me everything"
+    ]
+
+    # Route to specific image search
+    for trigger in specific_image_keywords:
+        if trigger in question:
+            search_term = question.split(trigger, 1)[1].strip()
+            if search_term:
+                limiter.check(client_key, "image_search")
+                found_images = search_illustrations(search_term)
+                if found_images:
+                    image_urls = [f"/illustrations/{img['file']}" for img in found_images]
+                    processing_time = time.time() - start_time
+                    logger.info(f"Image search completed in {processing_time:.3f}s")
+                    return QueryResponse(
+                        answer=f"Here are the illustrations I found for '{search_term}':",
+                        images=image_urls,
+                        image_details=describe_images(found_images),
+                        processing_time=processing_time,
+                        llm_used="image_search"
+                    )
+                else:
+                    processing_time = time.time() - start_time
+                    return QueryResponse(
+                        answer=f"Sorry, I couldn't find any illustrations matching '{search_term}'. You can ask to see all of my art.",
+                        processing_time=processing_time,
+                        llm_used="image_search"
+                    )
+
+    # Enhanced "show me X images/illustrations" pattern matching
+    for show_pattern in show_me_patterns:
+        if question.startswith(show_pattern):
+            remaining_text = question[len(show_pattern):].strip()
+
+            # Check if it contains image indicators
+            for img_indicator in image_indicators:
+                if img_indicator in remaining_text:
+                    # Extract the search term (everything before the image indicator)
+                    parts = remaining_text.split(img_indicator)
+                    if len(parts) > 1:
+                        search_term = parts[0].strip()
+                    else:
+                        # Handle cases like "show me doug images" where the term comes before
+                        words = remaining_text.split()
+                        if img_indicator in words:
+                            idx = words.index(img_indicator)
+                            search_term = " ".join(words[:idx]).strip()
+                        else:
+                            search_term = remaining_text.replace(img_indicator, "").strip()
+
+                    if search_term:
+                        limiter.check(client_key, "image_search")
+                        found_images = search_illustrations(search_term)
+                        if found_images:
+                            image_urls = [f"/illustrations/{img['file']}" for img in found_images]
+                            processing_time = time.time() - start_time
+                            logger.info(
+                                f"Enhanced image search completed in {processing_time:.3f}s for '{search_term}'")
+                            return QueryResponse(
+                                answer=f"Here are the {search_term} illustrations I found:",
+                                images=image_urls,
+                                image_details=describe_images(found_images),
+                                processing_time=processing_time,
+                                llm_used="image_search"
+                            )
+                        else:
+                            processing_time = time.time() - start_time
+                            return QueryResponse(
+                                answer=f"Sorry, I couldn't find any illustrations matching '{search_term}'. You can ask to see all of my art.",
+                                processing_time=processing_time,
+                                llm_used="image_search"
+                            )
+                    break
+    # Route to show all images
+    if question in all_image_phrases:
+        limiter.check(client_key, "image_search")
+        all_images = search_illustrations("all")
+        if all_images:
+            image_urls = [f"/illustrations/{img['file']}" for img in all_images]
+            processing_time = time.time() - start_time
+            logger.info(f"All images search completed in {processing_time:.3f}s")
+            return QueryResponse(
+                answer="Of course! Here are some of my illustrations:",
+                images=image_urls,
+                image_details=describe_images(all_images),
+                processing_time=processing_time,
+                llm_used="image_search"
+            )
+        else:
+            processing_time = time.time() - start_time
+            return QueryResponse(
+                answer="I couldn't find any illustrations at the moment.",
+                processing_time=processing_time,
+                llm_used="image_search"
+            )
+
+    # General pattern matching for "<subject> images" or similar patterns
+    words = question.split()
+    for img_indicator in image_indicators:
+        if img_indicator in words:
+            # Get the index of the image indicator
+            idx = words.index(img_indicator)
+
+            # Extract words before and after the image indicator
+            words_before = words[:idx]
+            words_after = words[idx+1:]
+
+            # Filter out ignore words
+            search_terms_before = [w for w in words_before if w not in ignore_words]
+            search_terms_after = [w for w in words_after if w not in ignore_words]
+
+            # Combine the search terms
+            search_term = " ".join(search_terms_before + search_terms_after).strip()
+
+            if search_term:
+                limiter.check(client_key, "image_search")
+                found_images = search_illustrations(search_term)
+                if found_images:
+                    image_urls = [f"/illustrations/{img['file']}" for img in found_images]
+                    processing_time = time.time() - start_time
+                    logger.info(f"General image search completed in {processing_time:.3f}s for '{search_term}'")
+                    return QueryResponse(
+                        answer=f"Here are the illustrations I found for '{search_term}':",
+                        images=image_urls,
+                        image_details=describe_images(found_images),
+                        processing_time=processing_time,
+                        llm_used="image_search"
+                    )
+                else:
+                    processing_time = time.time() - start_time
+                    return QueryResponse(
+                        answer=f"Sorry, I couldn't find any illustrations matching '{search_term}'. You can ask to see all of my art.",
+                        processing_time=processing_time,
+                        llm_used="image_search"
+                    )
+
+    return None
+
+
 @app.post("/query", response_model=QueryResponse)
-@limiter.limit("5/minute")
 async def query_endpoint(request: Request, query: Query) -> QueryResponse:
     """
     Main query endpoint that handles both text queries and illustration searches.
@@ -308,6 +781,8 @@ async def query_endpoint(request: Request, query: Query) -> QueryResponse:
     """
     start_time = time.time()
     llm_used = None
+    client_key = get_client_key(request)
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
 
     try:
         question = query.question.lower().strip()
@@ -315,164 +790,51 @@ async def query_endpoint(request: Request, query: Query) -> QueryResponse:
         # Log the query (truncated for privacy)
         logger.info(f"Processing query: {question[:50]}{'...' if len(question) > 50 else ''}")
 
-        # Define image-related keywords that indicate user wants illustrations
-        image_keywords = [
-            "image", "images", "illustration", "illustrations", "drawing", "drawings",
-            "art", "design", "designs", "pic", "pics", "picture", "pictures"
-        ]
-
-        # Define search patterns
-        specific_image_keywords = [
-            "images of", "image of", "drawings of", "drawing of",
-            "illustrations of", "illustration of", "art about", "art of"
-        ]
-
-        # Enhanced image search patterns
-        show_me_patterns = [
-            "show me", "show", "find", "get", "display"
-        ]
-
-        image_indicators = [
-            "images", "image", "illustrations", "illustration", "drawings", "drawing", "art", "pics", "pictures"
-        ]
-
-        # Words to ignore when building search terms
-        ignore_words = {
-            "show", "me", "get", "find", "display", "see", "view", "look", "at",
-            "the", "a", "an", "some", "any", "all", "your", "of", "for"
-        }
+        # With a session, the server keeps the history and the client sends only the new question
+        session_id = None
+        session_history = None
+        if query.session_id is not None:
+            session_history = sessions.get_history(query.session_id)
+            if session_history is None:
+                # Expired or evicted: without the client's history the context would be lost
+                if query.session_id and not query.chat_history:
+                    raise HTTPException(
+                        status_code=409,
+                        detail="Chat session expired - resend chat_history to restore it"
+                    )
+                session_history = format_chat_history(query.chat_history)
+                session_id = sessions.create(session_history)
+            else:
+                session_id = query.session_id
 
-        # Special phrases for showing all images
-        all_image_phrases = [
-            "show me all illustrations", "show all illustrations", "show me your illustrations",
-            "show me all your art", "show me all images", "show me images", "show your art",
-            "all images", "all illustrations", "all art", "show me everything"
-        ]
-
-        # Route to specific image search
-        for trigger in specific_image_keywords:
-            if trigger in question:
-                search_term = question.split(trigger, 1)[1].strip()
-                if search_term:
-                    found_images = search_illustrations(search_term)
-                    if found_images:
-                        image_urls = [f"/illustrations/{img['file']}" for img in found_images]
-                        processing_time = time.time() - start_time
-                        logger.info(f"Image search completed in {processing_time:.3f}s")
-                        return QueryResponse(
-                            answer=f"Here are the illustrations I found for '{search_term}':",
-                            images=image_urls,
-                            processing_time=processing_time,
-                            llm_used="image_search"
-                        )
-                    else:
-                        processing_time = time.time() - start_time
-                        return QueryResponse(
-                            answer=f"Sorry, I couldn't find any illustrations matching '{search_term}'. You can ask to see all of my art.",
-                            processing_time=processing_time,
-                            llm_used="image_search"
-                        )
+        image_response = route_image_query(question, client_key, start_time)
+        if image_response:
+            if session_id:
+                sessions.append(session_id, query.question, image_response.answer)
+                image_response.session_id = session_id
+            return image_response
 
-        # Enhanced "show me X images/illustrations" pattern matching
-        for show_pattern in show_me_patterns:
-            if question.startswith(show_pattern):
-                remaining_text = question[len(show_pattern):].strip()
-
-                # Check if it contains image indicators
-                for img_indicator in image_indicators:
-                    if img_indicator in remaining_text:
-                        # Extract the search term (everything before the image indicator)
-                        parts = remaining_text.split(img_indicator)
-                        if len(parts) > 1:
-                            search_term = parts[0].strip()
-                        else:
-                            # Handle cases like "show me doug images" where the term comes before
-                            words = remaining_text.split()
-                            if img_indicator in words:
-                                idx = words.index(img_indicator)
-                                search_term = " ".join(words[:idx]).strip()
-                            else:
-                                search_term = remaining_text.replace(img_indicator, "").strip()
-
-                        if search_term:
-                            found_images = search_illustrations(search_term)
-                            if found_images:
-                                image_urls = [f"/illustrations/{img['file']}" for img in found_images]
-                                processing_time = time.time() - start_time
-                                logger.info(
-                                    f"Enhanced image search completed in {processing_time:.3f}s for '{search_term}'")
-                                return QueryResponse(
-                                    answer=f"Here are the {search_term} illustrations I found:",
-                                    images=image_urls,
-                                    processing_time=processing_time,
-                                    llm_used="image_search"
-                                )
-                            else:
-                                processing_time = time.time() - start_time
-                                return QueryResponse(
-                                    answer=f"Sorry, I couldn't find any illustrations matching '{search_term}'. You can ask to see all of my art.",
-                                    processing_time=processing_time,
-                                    llm_used="image_search"
-                                )
-                        break
-        # Route to show all images
-        if question in all_image_phrases:
-            all_images = search_illustrations("all")
-            if all_images:
-                image_urls = [f"/illustrations/{img['file']}" for img in all_images]
-                processing_time = time.time() - start_time
-                logger.info(f"All images search completed in {processing_time:.3f}s")
-                return QueryResponse(
-                    answer="Of course! Here are some of my illustrations:",
-                    images=image_urls,
-                    processing_time=processing_time,
-                    llm_used="image_search"
-                )
-            else:
-                processing_time = time.time() - start_time
-                return QueryResponse(
-                    answer="I couldn't find any illustrations at the moment.",
-                    processing_time=processing_time,
-                    llm_used="image_search"
-                )
-
-        # General pattern matching for "<subject> images" or similar patterns
-        words = question.split()
-        for img_indicator in image_indicators:
-            if img_indicator in words:
-                # Get the index of the image indicator
-                idx = words.index(img_indicator)
-
-                # Extract words before and after the image indicator
-                words_before = words[:idx]
-                words_after = words[idx+1:]
-
-                # Filter out ignore words
-                search_terms_before = [w for w in words_before if w not in ignore_words]
-                search_terms_after = [w for w in words_after if w not in ignore_words]
-
-                # Combine the search terms
-                search_term = " ".join(search_terms_before + search_terms_after).strip()
-
-                if search_term:
-                    found_images = search_illustrations(search_term)
-                    if found_images:
-                        image_urls = [f"/illustrations/{img['file']}" for img in found_images]
-                        processing_time = time.time() - start_time
-                        logger.info(f"General image search completed in {processing_time:.3f}s for '{search_term}'")
-                        return QueryResponse(
-                            answer=f"Here are the illustrations I found for '{search_term}':",
-                            images=image_urls,
-                            processing_time=processing_time,
-                            llm_used="image_search"
-                        )
-                    else:
-                        processing_time = time.time() - start_time
-                        return QueryResponse(
-                            answer=f"Sorry, I couldn't find any illustrations matching '{search_term}'. You can ask to see all of my art.",
-                            processing_time=processing_time,
-                            llm_used="image_search"
-                        )
+        # Format chat history
+        if session_id:
+            formatted_chat_history = session_history
+        else:
+            formatted_chat_history = format_chat_history(query.chat_history)
+
+        # Simple standalone factual lookups are answered from the fact index without an LLM call
+        fact = fact_index.match(query.question, formatted_chat_history)
+        if fact:
+            limiter.check(client_key, "fact_index")
+            if session_id:
+                sessions.append(session_id, query.question, fact.answer)
+            processing_time = time.time() - start_time
+            logger.info(f"Query answered from fact index ({fact.intent}) in {processing_time:.3f}s")
+            return QueryResponse(
+                answer=fact.answer,
+                processing_time=processing_time,
+                llm_used="fact_index",
+                session_id=session_id,
+                sources=fact.sources
+            )
 
         # Default to AI-powered text response
         if not retriever:
@@ -481,37 +843,66 @@ async def query_endpoint(request: Request, query: Query) -> QueryResponse:
                 detail=f"AI service temporarily unavailable - app not properly initialized"
             )
 
-        # Format chat history
-        formatted_chat_history = []
-        for message in query.chat_history:
-            if message.sender == 'user':
-                formatted_chat_history.append(HumanMessage(content=message.text))
-            elif message.sender in ['assistant', 'ai', 'bot']:
-                formatted_chat_history.append(AIMessage(content=message.text))
-
-        # Get AI response with enhanced error handling
-        try:
-            answer = invoke_with_fallback(retriever, formatted_chat_history, query.question)
-            llm_used = PRIMARY_LLM  # Assume primary was used unless we add tracking to the chain
-        except Exception as llm_error:
-            logger.error(f"LLM processing failed: {llm_error}")
-            answer = (
-                "I'm sorry, I'm currently experiencing technical difficulties with the AI service. "
-                "This might be due to high demand or temporary service issues. Please try again in a few moments."
-            )
-            llm_used = "fallback"
+        # Cached answers are free and skip admission; only a real LLM call spends the client's budget
+        cache_key = get_cache_key(query.question, formatted_chat_history)
+        cached_answer = get_cached_response(cache_key)
+        trace_id = None
+
+        if cached_answer:
+            limiter.check(client_key, "cache")
+            answer = cached_answer
+            llm_used = "cache"
+        else:
+            # Charged before queueing, so a client over its budget never takes a place in the queue
+            limiter.check(client_key, "llm")
+            async with admission.slot(timeout=deadline.remaining()) as admitted:
+                if admitted:
+                    # Get AI response with enhanced error handling
+                    work = asyncio.ensure_future(run_in_threadpool(
+                        invoke_with_fallback_result, retriever, formatted_chat_history, query.question,
+                        deadline=deadline
+                    ))
+                    try:
+                        # The chain stops itself at the deadline; wait_for is the hard stop for a stage that hangs
+                        result = await asyncio.wait_for(asyncio.shield(work), timeout=deadline.remaining())
+                        answer = result.answer
+                        trace_id = result.trace_id
+                        llm_used = result.provider if result.provider != "unavailable" else "fallback"
+                    except asyncio.TimeoutError:
+                        logger.warning(f"Request deadline of {deadline.budget:.1f}s expired during LLM processing")
+                        # The thread can't be cancelled; its provider call keeps the slot until it returns
+                        work.add_done_callback(lambda done: done.cancelled() or done.exception())
+                        admission.hold_until(work)
+                        answer = simple_fallback_response(query.question)
+                        llm_used = "deadline"
+                    except Exception as llm_error:
+                        logger.error(f"LLM processing failed: {llm_error}")
+                        answer = (
+                            "I'm sorry, I'm currently experiencing technical difficulties with the AI service. "
+                            "This might be due to high demand or temporary service issues. Please try again in a few moments."
+                        )
+                        llm_used = "fallback"
+                else:
+                    # Overloaded: answer fast and degraded rather than queueing behind slow providers,
+                    # and don't charge for the LLM call that didn't happen
+                    limiter.refund(client_key, "llm")
+                    answer, llm_used = degraded_answer(query.question, cache_key)
 
         if not answer:
             answer = "I'm sorry, I couldn't generate a response. Please try rephrasing your question."
             llm_used = "fallback"
 
+        if session_id:
+            sessions.append(session_id, query.question, answer)
+
         processing_time = time.time() - start_time
-        logger.info(f"Query processed successfully in {processing_time:.3f}s using {llm_used}")
+        logger.info(f"Query processed successfully in {processing_time:.3f}s using {llm_used} (trace {trace_id})")
 
         return QueryResponse(
             answer=answer,
             processing_time=processing_time,
-            llm_used=llm_used
+            llm_used=llm_used,
+            session_id=session_id
         )
 
     except HTTPException:
@@ -525,6 +916,144 @@ async def query_endpoint(request: Request, query: Query) -> QueryResponse:
         )
 
 
+async def stream_session_answer(websocket: WebSocket, session_id: str, client_key: str, question: str):
+    """Answer one chat message over a WebSocket, streaming text as it is generated."""
+    start_time = time.time()
+    deadline = Deadline()
+    logger.info(f"Processing session query: {question[:50]}{'...' if len(question) > 50 else ''}")
+
+    image_response = route_image_query(question.lower().strip(), client_key, start_time)
+    if image_response:
+        sessions.append(session_id, question, image_response.answer)
+        await websocket.send_json({"type": "images", **image_response.model_dump(exclude_none=True)})
+        return
+
+    chat_history = sessions.get_history(session_id) or []
+    fact = fact_index.match(question, chat_history)
+    if fact:
+        limiter.check(client_key, "fact_index")
+        sessions.append(session_id, question, fact.answer)
+        await websocket.send_json({"type": "chunk", "text": fact.answer})
+        await websocket.send_json({
+            "type": "done",
+            "llm_used": "fact_index",
+            "processing_time": time.time() - start_time,
+            "session_id": session_id,
+            "sources": fact.sources
+        })
+        return
+
+    if not retriever:
+        raise HTTPException(
+            status_code=503,
+            detail="AI service temporarily unavailable - app not properly initialized"
+        )
+
+    cache_key = get_cache_key(question, chat_history)
+    cached_answer = get_cached_response(cache_key)
+
+    if cached_answer:
+        limiter.check(client_key, "cache")
+        answer, llm_used = cached_answer, "cache"
+        await websocket.send_json({"type": "chunk", "text": answer})
+    else:
+        limiter.check(client_key, "llm")
+        async with admission.slot(timeout=deadline.remaining()) as admitted:
+            if admitted:
+                parts = []
+                llm_used = "fallback"
+                stream = stream_with_fallback(retriever, chat_history, question, deadline=deadline)
+                try:
+                    async for provider, text in iterate_in_threadpool(stream):
+                        parts.append(text)
+                        llm_used = provider
+                        await websocket.send_json({"type": "chunk", "text": text})
+                        if deadline.expired():
+                            logger.warning(f"Session deadline of {deadline.budget:.1f}s expired mid-stream")
+                            llm_used = "deadline"
+                            break
+                except WebSocketDisconnect:
+                    raise
+                except Exception as llm_error:
+                    logger.error(f"LLM streaming failed: {llm_error}")
+                    llm_used = "fallback"
+                    if not parts:
+                        parts.append(
+                            "I'm sorry, I'm currently experiencing technical difficulties with the AI service. "
+                            "Please try again in a few moments."
+                        )
+                        await websocket.send_json({"type": "chunk", "text": parts[0]})
+                finally:
+                    stream.close()
+                answer = "".join(parts)
+            else:
+                limiter.refund(client_key, "llm")
+                answer, llm_used = degraded_answer(question, cache_key)
+                await websocket.send_json({"type": "chunk", "text": answer})
+
+    sessions.append(session_id, question, answer)
+    processing_time = time.time() - start_time
+    logger.info(f"Session query processed in {processing_time:.3f}s using {llm_used}")
+    await websocket.send_json({
+        "type": "done",
+        "llm_used": llm_used,
+        "processing_time": processing_time,
+        "session_id": session_id
+    })
+
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Chat over a WebSocket with server-side history.
+
+    Connect with an optional ?session_id= to resume a session. The server
+    first sends {"type": "session", "session_id": ..., "restarted": ...};
+    "restarted" is true when the requested session had expired, and the
+    client should then include its "chat_history" with the next question.
+    For each {"question": ...} message the server sends either an "images"
+    message or a series of "chunk" messages followed by "done". Failures
+    are sent as "error".
+    """
+    await websocket.accept()
+    client_key = get_client_key(websocket)
+
+    requested_id = websocket.query_params.get("session_id")
+    session_id = requested_id
+    if sessions.get_history(session_id) is None:
+        session_id = sessions.create()
+    await websocket.send_json({
+        "type": "session",
+        "session_id": session_id,
+        "restarted": bool(requested_id) and session_id != requested_id
+    })
+
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+                question = str(message.get("question", "")).strip() if isinstance(message, dict) else ""
+                if question and message.get("chat_history"):
+                    # Only seeds a session that has no messages yet
+                    history = [Message(**item) for item in message["chat_history"]]
+                    sessions.restore(session_id, format_chat_history(history))
+            except (ValueError, TypeError):
+                question = ""
+            if not question:
+                await websocket.send_json({"type": "error", "status": 422, "detail": "Expected {\"question\": \"...\"}"})
+                continue
+
+            try:
+                await stream_session_answer(websocket, session_id, client_key, question)
+            except HTTPException as e:
+                error = {"type": "error", "status": e.status_code, "detail": e.detail}
+                if e.headers and "Retry-After" in e.headers:
+                    error["retry_after"] = int(e.headers["Retry-After"])
+                await websocket.send_json(error)
+    except WebSocketDisconnect:
+        logger.info(f"Chat session {session_id[:8]} disconnected")
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Global exception handler with better logging."""
@@ -0,0 +1,72 @@
+import asyncio
+
+from core.admission import AdmissionController
+
+
+def test_sheds_when_slots_and_queue_are_full():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=1)
+        release = asyncio.Event()
+        outcomes = []
+
+        async def request():
+            async with controller.slot() as admitted:
+                outcomes.append(admitted)
+                if admitted:
+                    await release.wait()
+
+        first = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(request())
+        await asyncio.sleep(0)
+
+        # One running, one waiting: the next request is shed immediately
+        await request()
+        assert outcomes == [True, False]
+        assert controller.get_stats()["queue_depth"] == 1
+
+        release.set()
+        await asyncio.gather(first, queued)
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted_total"] == 2
+    assert stats["shed_queue_full"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_queued_request_is_shed_after_timeout():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+        assert await controller.acquire()
+        assert not await controller.acquire()
+        controller.release()
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed_timeout"] == 1
+    assert stats["shed_total"] == 1
+
+
+def test_slot_is_held_until_work_that_outlived_the_request_finishes():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=0)
+        work = asyncio.get_running_loop().create_future()
+
+        async with controller.slot() as admitted:
+            assert admitted
+            controller.hold_until(work)
+
+        # The request has been answered, but its provider call is still running
+        assert controller.in_flight == 1
+        async with controller.slot() as admitted:
+            assert not admitted
+
+        work.set_result(None)
+        await asyncio.sleep(0)
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["held_after_deadline"] == 1
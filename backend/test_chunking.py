@@ -0,0 +1,46 @@
+from langchain_core.documents import Document
+
+from core.chunking import parse_markdown, parse_resume_text, structure_split
+
+
+def test_markdown_blocks_follow_heading_path():
+    blocks = parse_markdown(
+        "# About\n\n## Skills\n\nIntro paragraph\n\n- Vue\n- Astro\n\n### Design\n\nIllustration"
+    )
+
+    assert blocks == [
+        (("About", "Skills"), "Intro paragraph"),
+        (("About", "Skills"), "- Vue"),
+        (("About", "Skills"), "- Astro"),
+        (("About", "Skills", "Design"), "Illustration"),
+    ]
+
+
+def test_resume_text_is_split_into_sections_and_entries():
+    text = (
+        "Jane Doe Summary Builds frontends. Work Experience Acme Corp Denver, CO 1/2020 – 3/2024 "
+        "Developer ● Shipped things ● Fixed things Widgets LLC Boulder, CO 2/2018 – 1/2020 Intern "
+        "● Learned things Education State College"
+    )
+
+    blocks = parse_resume_text(text)
+
+    assert (("Jane Doe", "Summary"), "Builds frontends.") in blocks
+    assert (("Jane Doe", "Work Experience", "Acme Corp Denver, CO"), "Fixed things") in blocks
+    assert (("Jane Doe", "Work Experience", "Widgets LLC Boulder, CO"), "Learned things") in blocks
+    assert (("Jane Doe", "Education"), "State College") in blocks
+
+
+def test_structure_split_merges_small_sections_and_keeps_large_ones_whole(tmp_path):
+    source = tmp_path / "about.md"
+    source.write_text(
+        "# About Nick\n\n## Frontend\n\n" + "Builds UIs. " * 97 + "\n\n## Illustration\n\nDraws characters."
+        "\n\n## Contact\n\nSay hi.\n"
+    )
+    docs = [Document(page_content="flattened by the loader", metadata={"source": str(source)})]
+
+    splits = structure_split(docs)
+
+    assert [doc.metadata["section_path"] for doc in splits] == ["Frontend", "Illustration | Contact"]
+    assert all(doc.metadata["title"] == "About Nick" for doc in splits)
+    assert splits[1].page_content == "Illustration\nDraws characters.\nContact\nSay hi."
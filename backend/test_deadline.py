@@ -0,0 +1,53 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from core import deadline as deadline_module
+from core import llm_chain
+from core.deadline import Deadline, DeadlineExceeded, MAX_REQUEST_DEADLINE, REQUEST_DEADLINE
+
+
+def test_header_is_capped_and_invalid_values_use_default():
+    assert Deadline.from_header("1500").budget == pytest.approx(1.5)
+    assert Deadline.from_header(str(int(MAX_REQUEST_DEADLINE * 1000) * 10)).budget == MAX_REQUEST_DEADLINE
+    assert Deadline.from_header("soon").budget == min(REQUEST_DEADLINE, MAX_REQUEST_DEADLINE)
+    assert Deadline.from_header(None).budget == min(REQUEST_DEADLINE, MAX_REQUEST_DEADLINE)
+
+
+def test_expired_deadline_stops_stages():
+    deadline = Deadline(0)
+
+    assert deadline.expired()
+    assert deadline.timeout(30) == 0
+    assert not deadline.can_fit(1)
+    with pytest.raises(DeadlineExceeded):
+        deadline.check("retrieval")
+
+
+def test_each_llm_call_gets_the_budget_left_when_it_starts(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(deadline_module.time, "monotonic", lambda: clock[0])
+    timeouts = []
+
+    def create_llm(name, timeout=None, tier="large"):
+        timeouts.append(timeout)
+        clock[0] += 10
+        return FakeListChatModel(responses=["Where does Nick work?", "Nick works at Hillman Group."][len(timeouts) - 1:])
+
+    monkeypatch.setattr(llm_chain, "create_llm", create_llm)
+    vectorstore = InMemoryVectorStore(DeterministicFakeEmbedding(size=8))
+    vectorstore.add_documents([Document(page_content="Nick works at Hillman Group.")])
+    deadline = Deadline(25)
+
+    llm = llm_chain._attempt_llm({}, "claude", "large", deadline)
+    chain = llm_chain.build_rag_chain(llm, vectorstore.as_retriever(), *llm_chain.create_prompts())
+    chain.invoke(
+        {"input": "And where?", "chat_history": [HumanMessage(content="hi"), AIMessage(content="hello")]},
+        config={"callbacks": deadline.callbacks()}
+    )
+
+    # Rephrasing starts with 25s left; answering starts 10s later
+    assert timeouts == [25, 15]
@@ -0,0 +1,83 @@
+import threading
+from time import sleep as real_sleep
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from core import embedding_pipeline
+from core.embedding_pipeline import BatchedEmbeddings
+
+
+class RateLimited(Exception):
+    pass
+
+
+class FlakyEmbeddings(Embeddings):
+    """Embeds a text as [len(text)]; fails the first `failures` calls, batches finish out of order."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            if self.failures:
+                self.failures -= 1
+                raise RateLimited("429 too many requests")
+        # Batches of shorter texts take longer, so the first batches complete last
+        real_sleep(0.05 / len(texts[0]))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        with self._lock:
+            self.calls.append([text])
+            if self.failures:
+                self.failures -= 1
+                raise RateLimited("429 too many requests")
+        return [float(len(text))]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedding_pipeline.time, "sleep", delays.append)
+    return delays
+
+
+def test_batches_keep_input_order():
+    texts = ["a" * n for n in range(1, 12)]
+    base = FlakyEmbeddings()
+    embeddings = BatchedEmbeddings(base, batch_size=3, concurrency=4)
+
+    assert embeddings.embed_documents(texts) == [[float(n)] for n in range(1, 12)]
+    assert sorted(len(batch) for batch in base.calls) == [2, 3, 3, 3]
+    assert embeddings.last_run["batches"] == 4
+
+
+def test_retryable_errors_back_off_exponentially(sleeps):
+    base = FlakyEmbeddings(failures=2)
+    embeddings = BatchedEmbeddings(
+        base, batch_size=10, max_retries=3, retry_backoff=1,
+        is_retryable=lambda error: isinstance(error, RateLimited)
+    )
+
+    assert embeddings.embed_documents(["ab", "c"]) == [[2.0], [1.0]]
+    assert len(sleeps) == 2
+    # Base delay doubles each attempt, plus up to 50% jitter
+    assert 1 <= sleeps[0] <= 1.5 and 2 <= sleeps[1] <= 3
+
+
+def test_retries_give_up_and_queries_never_retry(sleeps):
+    retryable = lambda error: isinstance(error, RateLimited)
+
+    embeddings = BatchedEmbeddings(FlakyEmbeddings(failures=5), max_retries=1, is_retryable=retryable)
+    with pytest.raises(RateLimited):
+        embeddings.embed_documents(["text"])
+    assert len(sleeps) == 1
+
+    embeddings = BatchedEmbeddings(FlakyEmbeddings(failures=1), max_retries=3, is_retryable=retryable)
+    with pytest.raises(RateLimited):
+        embeddings.embed_query("question")
+    assert len(sleeps) == 1
@@ -0,0 +1,67 @@
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from core.fact_index import FactIndex
+
+RESUME = (
+    "Jane Doe Summary Frontend developer with 8+ years' experience building accessible web apps. "
+    "Contact jane@example.com or 555-123-4567. "
+    "Technical Skills ● Vue.js ● TypeScript ● Software ● Figma ● Atlassian Software "
+    "Work Experience Acme Corp Denver, CO 1/2020 – Present Senior Developer Led the design system. "
+    "Old Co Boulder, CO 3/2015 – 1/2020 Developer Built marketing sites."
+)
+ABOUT = "# About\n\n## Technology Stack\n\n- **Backend**: Python, FastAPI\n"
+
+
+def build_index():
+    index = FactIndex()
+    index.build([
+        Document(page_content=RESUME, metadata={"source": "public/resume.pdf"}),
+        Document(page_content=ABOUT, metadata={"source": "missing/about.md"}),
+    ])
+    return index
+
+
+def test_factual_questions_are_answered_with_sources():
+    index = build_index()
+
+    answer = index.match("How many years of experience does Nick have?")
+    assert answer.intent == "years_experience"
+    assert "8+ years" in answer.answer
+    assert answer.sources == ["resume.pdf › Summary"]
+
+    answer = index.match("Where does Nick work?")
+    assert "currently works as Senior Developer at Acme Corp in Denver, CO (since 1/2020)" in answer.answer
+
+    answer = index.match("What are Nick's skills?")
+    assert "TypeScript" in answer.answer and "Python, FastAPI" in answer.answer
+    # "Software" is a line-wrapped piece of "Atlassian Software", not a skill
+    assert "Figma, Atlassian Software\n" in answer.answer
+    assert "about.md › Technology Stack" in answer.sources
+
+    assert "jane@example.com" in index.match("What is Nick's email?").answer
+
+
+def test_other_questions_fall_through_to_rag():
+    index = build_index()
+    assert index.match("What did Nick build at Acme?") is None
+    # Mentions a fact intent but asks something narrower than the index can answer
+    assert index.match("How many years of experience does Nick have with Vue?") is None
+    assert FactIndex().match("What is Nick's email?") is None
+
+    stats = index.get_stats()
+    assert stats["lookups"] == 2 and stats["hits"] == 0
+    assert stats["misses"] == {"follow_up": 0, "no_intent": 1, "low_confidence": 1, "no_fact": 0}
+
+
+def test_follow_up_questions_are_left_to_rag():
+    index = build_index()
+    history = [
+        HumanMessage(content="How many years of experience does Nick have?"),
+        AIMessage(content="Nick has 8+ years of experience building accessible web apps."),
+    ]
+    assert index.match("Which company?", history) is None
+    assert index.match("What tools did he use there?", history) is None
+    # Referring words mark a follow-up even when the client sent no history
+    assert index.match("How long did he work there?") is None
+    assert index.get_stats()["misses"]["follow_up"] == 3
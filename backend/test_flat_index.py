@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core.flat_index import FlatVectorStore
+from core.indexer import sync_index
+
+
+def make_docs(*texts):
+    return [Document(page_content=text, metadata={"source": "about.md"}) for text in texts]
+
+
+def test_exact_top_k_matches_brute_force():
+    embeddings = DeterministicFakeEmbedding(size=16)
+    texts = [f"chunk {i}" for i in range(50)]
+    store = FlatVectorStore.from_texts(texts, embeddings)
+
+    query = embeddings.embed_query("chunk 7")
+    vectors = np.array(embeddings.embed_documents(texts))
+    expected = np.argsort(-(vectors @ query) / np.linalg.norm(vectors, axis=1))[:4]
+
+    results = store.similarity_search_with_score("chunk 7", k=4)
+
+    assert [doc.page_content for doc, _ in results] == [texts[i] for i in expected]
+    assert results[0][0].page_content == "chunk 7"
+    assert results[0][1] > 0.99
+
+
+def test_save_and_load_memory_maps_vectors(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    store = FlatVectorStore(embeddings, dtype="float16")
+    sync_index(store, make_docs("intro", "skills", "projects"))
+    store.save(str(tmp_path))
+
+    loaded = FlatVectorStore.load(str(tmp_path), embeddings)
+
+    assert isinstance(loaded._state[0], np.memmap)
+    assert loaded._state[0].dtype == np.float16
+    assert loaded.as_retriever(search_kwargs={"k": 1}).invoke("skills")[0].page_content == "skills"
+
+    report = sync_index(loaded, make_docs("intro", "skills v2", "projects"))
+    assert (report["added"], report["removed"], report["unchanged"]) == (1, 1, 2)
+    assert sorted(loaded.get()["documents"]) == ["intro", "projects", "skills v2"]
+
+
+def test_load_rejects_mismatched_vectors_and_records(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    store = FlatVectorStore(embeddings)
+    sync_index(store, make_docs("intro", "skills"))
+    store.save(str(tmp_path))
+    store.save(str(tmp_path))
+    assert os.listdir(tmp_path) == ["index.flat"]
+
+    # Drop a record without its vector, as a save interleaved with another would
+    matrix, ids, texts, metadatas = store._state
+    store._state = (matrix, ids[:1], texts[:1], metadatas[:1])
+    store.save(str(tmp_path))
+    with pytest.raises(ValueError):
+        FlatVectorStore.load(str(tmp_path), embeddings)
@@ -0,0 +1,71 @@
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+from core import http_cache
+from core.http_cache import (
+    cacheable_json_response, etag_matches, make_etag, negotiate_encoding, not_modified_response
+)
+
+
+def make_request(**headers):
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_etag_matching_is_weak_and_handles_lists_and_wildcard():
+    etag = make_etag("illustrations", 3)
+    strong = etag[2:]
+
+    assert etag_matches(make_request(if_none_match=etag), etag)
+    assert etag_matches(make_request(if_none_match=strong), etag)
+    assert etag_matches(make_request(if_none_match=f'"other", {strong}'), etag)
+    assert etag_matches(make_request(if_none_match="*"), etag)
+    assert not etag_matches(make_request(if_none_match='W/"other"'), etag)
+    assert not etag_matches(make_request(), etag)
+
+
+def test_encoding_follows_client_quality_values(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", object())
+
+    assert negotiate_encoding(make_request(accept_encoding="gzip, deflate, br")) == "br"
+    assert negotiate_encoding(make_request(accept_encoding="br;q=0.1, gzip")) == "gzip"
+    assert negotiate_encoding(make_request(accept_encoding="gzip; q=0.5, br; q=0.8")) == "br"
+    assert negotiate_encoding(make_request(accept_encoding="*;q=0.5, gzip;q=0.9")) == "gzip"
+    assert negotiate_encoding(make_request(accept_encoding="br;q=0, *")) == "gzip"
+    assert negotiate_encoding(make_request(accept_encoding="identity")) is None
+    assert negotiate_encoding(make_request()) is None
+
+    monkeypatch.setattr(http_cache, "brotli", None)
+    assert negotiate_encoding(make_request(accept_encoding="br, gzip;q=0.5")) == "gzip"
+
+
+def test_not_modified_response_is_empty_and_keeps_validators():
+    response = not_modified_response({"ETag": 'W/"abc"', "Cache-Control": "public, max-age=300"})
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["cache-control"] == "public, max-age=300"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "br"])
+def test_large_bodies_are_compressed_and_small_ones_are_not(accept_encoding):
+    if accept_encoding == "br" and http_cache.brotli is None:
+        pytest.skip("brotli not installed")
+    payload = {"results": [{"file": f"illustration-{i}.png"} for i in range(50)]}
+
+    response = cacheable_json_response(make_request(accept_encoding=accept_encoding), payload, {"ETag": 'W/"v1"'})
+    assert response.headers["content-encoding"] == accept_encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    decompress = gzip.decompress if accept_encoding == "gzip" else http_cache.brotli.decompress
+    assert json.loads(decompress(response.body)) == payload
+
+    small = cacheable_json_response(make_request(accept_encoding=accept_encoding), {"results": []}, {})
+    assert "content-encoding" not in small.headers
+    assert json.loads(small.body) == {"results": []}
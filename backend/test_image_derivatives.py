@@ -0,0 +1,64 @@
+import json
+
+from PIL import Image
+
+import build_image_derivatives as build
+
+
+def configure(tmp_path, monkeypatch, widths=(160, 320, 640)):
+    source_dir, derived_dir = tmp_path / "illustrations", tmp_path / "illustrations" / "derived"
+    source_dir.mkdir()
+    Image.new("RGB", (500, 250), "teal").save(source_dir / "robot.png")
+    (tmp_path / "illustrations.json").write_text(json.dumps([{"file": "robot.png"}, {"title": "no file"}]))
+
+    monkeypatch.setattr(build, "ILLUSTRATIONS_PATH", str(tmp_path / "illustrations.json"))
+    monkeypatch.setattr(build, "ILLUSTRATIONS_DIR", str(source_dir))
+    monkeypatch.setattr(build, "DERIVATIVES_DIR", str(derived_dir))
+    monkeypatch.setattr(build, "DERIVATIVES_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(build, "DERIVATIVE_WIDTHS", list(widths))
+    monkeypatch.setattr(build, "available_formats", lambda: ["webp"])
+    return derived_dir
+
+
+def test_target_widths_never_upscale(monkeypatch):
+    monkeypatch.setattr(build, "DERIVATIVE_WIDTHS", [640, 160, 320, 1280])
+
+    assert build.target_widths(2000) == [160, 320, 640, 1280]
+    assert build.target_widths(500) == [160, 320]
+    assert build.target_widths(100) == [100]
+
+
+def test_manifest_describes_hashed_variants_and_prunes_stale_files(tmp_path, monkeypatch):
+    derived_dir = configure(tmp_path, monkeypatch)
+    derived_dir.mkdir()
+    (derived_dir / "robot-160.stale.webp").write_bytes(b"old")
+
+    assert build.main(["--prune"]) == 0
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["formats"] == ["webp"] and len(manifest["version"]) == 16
+    entry = manifest["images"]["robot.png"]
+    assert (entry["width"], entry["height"]) == (500, 250)
+    assert entry["placeholder"].startswith("data:image/webp;base64,")
+    assert [(v["format"], v["width"], v["height"]) for v in entry["variants"]] == [
+        ("webp", 160, 80), ("webp", 320, 160)
+    ]
+    assert sorted(path.name for path in derived_dir.iterdir()) == sorted(
+        v["url"].rsplit("/", 1)[1] for v in entry["variants"]
+    )
+    for variant in entry["variants"]:
+        with Image.open(derived_dir / variant["url"].rsplit("/", 1)[1]) as image:
+            assert image.size == (variant["width"], variant["height"])
+
+    # Unchanged sources keep their file names, so a rebuild writes the same manifest
+    assert build.main([]) == 0
+    assert json.loads((tmp_path / "manifest.json").read_text())["version"] == manifest["version"]
+
+
+def test_missing_pillow_only_fails_when_required(tmp_path, monkeypatch):
+    configure(tmp_path, monkeypatch)
+    monkeypatch.setattr(build, "Image", None)
+
+    assert build.main([]) == 1
+    assert build.main(["--optional"]) == 0
+    assert not (tmp_path / "manifest.json").exists()
@@ -0,0 +1,80 @@
+import uuid
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core import llm_chain
+from core.indexer import sync_index, chunk_id, get_existing_ids
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def make_vectorstore(embeddings):
+    return Chroma(
+        client=chromadb.EphemeralClient(),
+        collection_name=f"test_{uuid.uuid4().hex}",
+        embedding_function=embeddings,
+    )
+
+
+def make_docs(*texts):
+    return [Document(page_content=text, metadata={"source": "about.md"}) for text in texts]
+
+
+def test_chunk_ids_are_stable():
+    first, second = make_docs("Nick builds frontends")[0], make_docs("Nick builds frontends")[0]
+    assert chunk_id(first) == chunk_id(second)
+    assert chunk_id(first) != chunk_id(make_docs("Nick draws illustrations")[0])
+
+
+def test_sync_only_embeds_changed_chunks():
+    embeddings = CountingEmbeddings(size=8)
+    vectorstore = make_vectorstore(embeddings)
+
+    report = sync_index(vectorstore, make_docs("intro", "skills", "projects"))
+    assert report["added"] == 3
+    assert embeddings.embedded == 3
+
+    report = sync_index(vectorstore, make_docs("intro", "skills v2", "projects"))
+    assert report == {**report, "added": 1, "removed": 1, "unchanged": 2, "total": 3}
+    assert embeddings.embedded == 4
+
+    stored = vectorstore.get()
+    assert sorted(stored["documents"]) == ["intro", "projects", "skills v2"]
+
+
+def test_index_version_tracks_content():
+    embeddings = DeterministicFakeEmbedding(size=8)
+    first = sync_index(make_vectorstore(embeddings), make_docs("intro", "skills"))
+    same = sync_index(make_vectorstore(embeddings), make_docs("skills", "intro"))
+    changed = sync_index(make_vectorstore(embeddings), make_docs("intro", "skills v2"))
+
+    assert first["version"] == same["version"]
+    assert first["version"] != changed["version"]
+
+
+def test_workers_read_a_prebuilt_chroma_index_without_writing(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_chain, "CHROMA_PERSIST_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_chain, "VECTOR_STORE", "chroma")
+    monkeypatch.setattr(llm_chain, "_index_version", "")
+    embeddings = DeterministicFakeEmbedding(size=8)
+    docs = [Document(page_content="Nick works at Hillman Group.", metadata={"source": "about.md"})]
+
+    built = llm_chain.create_full_retrieval_chain(docs, embeddings, build=True)
+    version = llm_chain._index_version
+
+    # A worker started with newer sources serves the built index until it is rebuilt
+    changed = [Document(page_content="Nick draws robots.", metadata={"source": "about.md"})]
+    worker = llm_chain.create_full_retrieval_chain(changed, embeddings)
+
+    assert get_existing_ids(worker.vectorstore) == get_existing_ids(built.vectorstore)
+    assert len(get_existing_ids(worker.vectorstore)) == 1
+    assert llm_chain._index_version == version
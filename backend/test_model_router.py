@@ -0,0 +1,62 @@
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from core import llm_chain
+from core.model_router import classify_question, is_low_confidence, routing_stats
+
+
+def test_simple_questions_go_to_the_fast_tier():
+    assert classify_question("hi", []).tier == "fast"
+    assert classify_question("What's Nick's email?", []).tier == "fast"
+
+
+def test_multi_part_and_reasoning_questions_go_to_the_large_tier():
+    decision = classify_question(
+        "Compare Nick's work at Hillman and Wisnet, and explain why he moved?", []
+    )
+    assert decision.tier == "large"
+    assert "reasoning" in decision.reasons
+
+    history = [HumanMessage(content="hi"), AIMessage(content="hello")] * 3
+    decision = classify_question("What did he build there and which tools did he use?", history)
+    assert decision.tier == "large"
+    assert {"multi_part", "long_history"} <= set(decision.reasons)
+
+
+def test_weak_answers_are_low_confidence():
+    assert is_low_confidence("I'm sorry, I don't have that information.")
+    assert is_low_confidence("Yes.")
+    assert not is_low_confidence("Nick works as a frontend developer at Hillman Group.")
+
+
+class MissingModel(FakeListChatModel):
+    def _call(self, *args, **kwargs):
+        raise ValueError("not_found_error: model: retired-fast-model")
+
+
+def test_fast_tier_failure_falls_back_to_the_large_model(monkeypatch):
+    large = FakeListChatModel(responses=["Nick works as a frontend developer at Hillman Group."])
+    monkeypatch.setattr(llm_chain, "get_llm_instances", lambda: {"claude": large, "gemini": None})
+    monkeypatch.setattr(llm_chain, "create_llm", lambda name, timeout=None, tier="large": (
+        MissingModel(responses=["unused"]) if tier == "fast" else large
+    ))
+    monkeypatch.setattr(llm_chain, "cache_response", lambda *args, **kwargs: None)
+
+    vectorstore = InMemoryVectorStore(DeterministicFakeEmbedding(size=8))
+    vectorstore.add_documents([Document(page_content="Nick works at Hillman Group.")])
+    escalations = routing_stats.escalations
+
+    result = llm_chain.invoke_with_fallback_result(
+        vectorstore.as_retriever(), [], "Where does Nick work?", read_cache=False
+    )
+    assert result.provider == "claude"
+    assert "Hillman Group" in result.answer
+    assert routing_stats.escalations == escalations + 1
+
+    # The streaming path falls back the same way
+    large.i = 0
+    pieces = list(llm_chain.stream_with_fallback(vectorstore.as_retriever(), [], "Where does Nick work?"))
+    assert {provider for provider, _ in pieces} == {"claude"}
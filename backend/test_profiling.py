@@ -0,0 +1,58 @@
+import sys
+import itertools
+
+from core import profiling
+from core.profiling import ProfileStore, RequestProfiler, StackSampler
+
+
+def test_store_keeps_only_the_newest_profiles(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(profiling.time, "time", lambda: next(clock))
+    store = ProfileStore(str(tmp_path), max_files=2)
+
+    ids = [store.save(f"main;work {i}", {"path": f"/query/{i}"}) for i in range(3)]
+
+    assert [p["id"] for p in store.list()] == [ids[2], ids[1]]
+    assert store.load(ids[0]) is None
+    assert store.load(ids[2]) == "main;work 2"
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f"{profile_id}{ext}" for profile_id in ids[1:] for ext in (".folded", ".json")
+    )
+
+
+def test_load_rejects_malformed_ids(tmp_path):
+    store = ProfileStore(str(tmp_path / "profiles"), max_files=5)
+    (tmp_path / "secret.folded").write_text("secret")
+    store.save("main 1", {})
+
+    for profile_id in ("../secret", "..%2Fsecret", "secret", "1-abc", "1-0123456g", ""):
+        assert store.load(profile_id) is None
+
+
+def test_folded_stacks_only_include_backend_frames():
+    sampler = StackSampler(interval=0.001)
+
+    stack = sampler._fold(sys._getframe())
+    assert stack.split(";")[-1].startswith("test_folded_stacks_only_include_backend_frames (test_profiling.py:")
+
+    sampler.stacks["MainThread;a (x.py:1);b (x.py:2)"] += 3
+    sampler.stacks["MainThread;a (x.py:1)"] += 1
+    assert sampler.folded() == "MainThread;a (x.py:1);b (x.py:2) 3\nMainThread;a (x.py:1) 1"
+
+
+def test_finish_stops_the_sampler_and_frees_the_profiler(tmp_path, monkeypatch):
+    profiler = RequestProfiler(ProfileStore(str(tmp_path), max_files=5), interval_ms=1)
+
+    sampler = profiler.try_start()
+    assert sampler is not None and profiler.try_start() is None
+
+    def fail(folded, metadata):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(profiler.store, "save", fail)
+    assert profiler.finish(sampler, {"status": 500}) is None
+    assert not sampler._thread.is_alive()
+
+    sampler = profiler.try_start()
+    assert sampler is not None
+    profiler.finish(sampler, {})
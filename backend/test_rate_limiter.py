@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+import pytest
+
+from core.rate_limiter import (
+    MemoryBucketStore, SQLiteBucketStore, TokenBucketLimiter, RateLimitExceeded
+)
+
+
+def make_limiter(store):
+    return TokenBucketLimiter(
+        store,
+        capacity=2,
+        refill_per_minute=60,
+        route_costs={"llm": 1, "image_search": 0, "cache": 0},
+    )
+
+
+def test_llm_route_spends_tokens_and_reports_retry_after():
+    limiter = make_limiter(MemoryBucketStore())
+
+    assert limiter.check("client", "llm") == pytest.approx(1, abs=0.1)
+    limiter.check("client", "llm")
+
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        limiter.check("client", "llm")
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+
+def test_free_routes_do_not_spend_tokens():
+    limiter = make_limiter(MemoryBucketStore())
+
+    for _ in range(10):
+        limiter.check("client", "image_search")
+        limiter.check("client", "cache")
+
+    limiter.check("client", "llm")
+    limiter.check("client", "llm")
+
+
+def test_sqlite_store_is_shared_between_limiters():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "buckets.sqlite3")
+        first = make_limiter(SQLiteBucketStore(path))
+        second = make_limiter(SQLiteBucketStore(path))
+
+        first.check("client", "llm")
+        second.check("client", "llm")
+
+        with pytest.raises(RateLimitExceeded):
+            first.check("client", "llm")
+
+        # Other clients have their own bucket
+        second.check("other-client", "llm")
+
+
+def test_refund_returns_tokens_up_to_capacity():
+    limiter = make_limiter(MemoryBucketStore())
+
+    limiter.check("client", "llm")
+    limiter.check("client", "llm")
+    limiter.refund("client", "llm")
+    limiter.check("client", "llm")
+
+    limiter.refund("client", "llm")
+    limiter.refund("client", "llm")
+    limiter.refund("client", "llm")
+    assert limiter.check("client", "llm") == pytest.approx(1, abs=0.1)
@@ -0,0 +1,93 @@
+import time
+
+from langchain_core.documents import Document
+
+from backend import warm_cache
+from backend.core.fact_index import FactIndex
+from core import llm_chain
+from core.llm_chain import FallbackResult
+from core.response_cache import SQLiteResponseStore
+
+
+def entry(response, age=0, ttl=60):
+    return {"response": response, "timestamp": time.time() - age, "ttl": ttl}
+
+
+def test_expired_rows_are_deleted_when_read(tmp_path):
+    store = SQLiteResponseStore(str(tmp_path / "cache.sqlite3"))
+    store.set("fresh", entry("hi"))
+    store.set("stale", entry("old", age=120))
+
+    assert store.get("fresh")["response"] == "hi"
+    assert store.get("stale") is None
+    assert store.stats()["total_entries"] == 1
+
+
+def test_prune_drops_expired_rows_and_caps_the_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteResponseStore, "PRUNE_EVERY_N_SETS", 5)
+    store = SQLiteResponseStore(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    store.set("stale", entry("old", age=120))
+    for i in range(4):
+        store.set(f"q{i}", entry(f"answer {i}", age=10 - i))
+
+    # The fifth write prunes: the expired row and the oldest row beyond the cap go
+    assert store.stats()["total_entries"] == 3
+    assert store.get("q0") is None
+    assert [store.get(f"q{i}")["response"] for i in (1, 2, 3)] == ["answer 1", "answer 2", "answer 3"]
+
+
+def test_entries_keep_their_own_ttl(tmp_path, monkeypatch):
+    store = SQLiteResponseStore(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_chain, "_persistent_cache", store)
+    monkeypatch.setattr(llm_chain, "_response_cache", {})
+
+    llm_chain.cache_response("warmed", "for a week", ttl=7 * 24 * 3600)
+    llm_chain.cache_response("regular", "for an hour")
+    # A day later, only the warmed answer is still served, from memory or from the shared file
+    for data in llm_chain._response_cache.values():
+        data["timestamp"] -= 24 * 3600
+    store._connection().execute("UPDATE responses SET timestamp = timestamp - ?", (24 * 3600,))
+
+    assert llm_chain.get_cached_response("warmed") == "for a week"
+    assert llm_chain.get_cached_response("regular") is None
+    llm_chain._response_cache.clear()
+    assert llm_chain.get_cached_response("warmed") == "for a week"
+    assert llm_chain.get_cached_response("regular") is None
+    assert store.stats()["total_entries"] == 1
+
+
+def test_read_questions_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / "questions.txt"
+    path.write_text("# FAQ\nWho is Nick?\n\n  What is Atomic Docs?  \n#What is his email?\n")
+
+    assert warm_cache.read_questions(str(path)) == ["Who is Nick?", "What is Atomic Docs?"]
+
+
+def test_warm_question_reports_provider_and_passes_cache_options(monkeypatch):
+    calls = []
+
+    def invoke(retriever, chat_history, question, read_cache=True, cache_ttl=None):
+        calls.append((question, read_cache, cache_ttl))
+        if question == "broken":
+            raise RuntimeError("provider down")
+        return FallbackResult("answer", "claude")
+
+    monkeypatch.setattr(warm_cache, "invoke_with_fallback_result", invoke)
+
+    assert warm_cache.warm_question(None, "Who is Nick?", refresh=True, ttl=60)["provider"] == "claude"
+    assert warm_cache.warm_question(None, "broken", refresh=False, ttl=60)["provider"] == "error"
+    assert calls == [("Who is Nick?", False, 60), ("broken", True, 60)]
+
+
+def test_questions_the_fact_index_answers_are_not_warmed():
+    fact_index = FactIndex()
+    fact_index.build([Document(
+        page_content="Jane Doe Technical Skills ● Vue.js ● TypeScript",
+        metadata={"source": "public/resume.pdf"}
+    )])
+
+    to_warm, answered = warm_cache.split_fact_questions(
+        ["What are his skills?", "What is Atomic Docs?"], fact_index
+    )
+    assert to_warm == ["What is Atomic Docs?"]
+    assert answered == ["What are his skills?"]
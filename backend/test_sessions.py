@@ -0,0 +1,61 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from core.sessions import SessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    if request.param == "sqlite":
+        return lambda **kwargs: SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), **kwargs)
+    return SessionStore
+
+
+def test_history_is_bounded_and_least_recently_used_session_is_evicted(make_store):
+    store = make_store(ttl=60, max_sessions=2, max_messages=4)
+    first = store.create([HumanMessage(content="hi")])
+    second = store.create()
+
+    for i in range(3):
+        store.append(first, f"question {i}", f"answer {i}")
+    history = store.get_history(first)
+    assert [m.content for m in history] == ["question 1", "answer 1", "question 2", "answer 2"]
+
+    # first was used more recently, so second is evicted
+    third = store.create()
+    assert store.get_history(second) is None
+    assert store.get_history(first) is not None
+    assert store.get_history(third) == []
+    assert store.stats()["evicted_total"] == 1
+
+
+def test_idle_sessions_expire(make_store):
+    store = make_store(ttl=0)
+    session_id = store.create()
+
+    assert store.get_history(session_id) is None
+    assert store.get_history("unknown") is None
+    assert store.stats()["expired_total"] == 1
+
+
+def test_restore_only_seeds_an_empty_session(make_store):
+    store = make_store(ttl=60)
+    session_id = store.create()
+
+    assert store.restore(session_id, [HumanMessage(content="earlier question")])
+    assert not store.restore(session_id, [HumanMessage(content="replacement")])
+    assert not store.restore("unknown", [])
+    assert [m.content for m in store.get_history(session_id)] == ["earlier question"]
+
+
+def test_sqlite_sessions_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first_worker, second_worker = SQLiteSessionStore(path, ttl=60), SQLiteSessionStore(path, ttl=60)
+
+    session_id = first_worker.create([HumanMessage(content="hi")])
+    second_worker.append(session_id, "Where does Nick work?", "Hillman Group.")
+
+    assert [m.content for m in first_worker.get_history(session_id)] == [
+        "hi", "Where does Nick work?", "Hillman Group."
+    ]
+    assert second_worker.stats()["active_sessions"] == 1
@@ -0,0 +1,101 @@
+import re
+from collections import deque
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from core import tracing
+from core.llm_chain import build_rag_chain, create_prompts
+from core.tracing import finish_trace, get_trace, get_traces, start_trace, to_otlp
+
+
+def make_retriever():
+    vectorstore = InMemoryVectorStore(DeterministicFakeEmbedding(size=8))
+    vectorstore.add_documents([
+        Document(page_content="Nick works at Hillman Group.", metadata={"source": "resume.pdf", "chunk_id": "c1"}),
+        Document(page_content="Nick draws illustrations.", metadata={"source": "about.md", "chunk_id": "c2"}),
+    ])
+    return vectorstore.as_retriever(search_kwargs={"k": 2})
+
+
+def usage(input_tokens, output_tokens):
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens}
+
+
+def run_traced_chain():
+    # With history, the chain first asks the model to rephrase the question, then answers it
+    llm = GenericFakeChatModel(messages=iter([
+        AIMessage(content="Where does Nick work?", usage_metadata=usage(30, 5)),
+        AIMessage(content="Nick works at Hillman Group.", usage_metadata=usage(120, 8)),
+    ]))
+    chain = build_rag_chain(llm, make_retriever(), *create_prompts())
+
+    trace = start_trace("test_request")
+    with trace.span("claude attempt 1", "attempt", {"provider": "claude"}) as attempt:
+        chain.invoke(
+            {"input": "And where does he work?",
+             "chat_history": [HumanMessage(content="hi"), AIMessage(content="hello")]},
+            config={"callbacks": trace.callbacks(attempt)},
+        )
+    finish_trace(trace, provider="claude")
+    return trace, attempt
+
+
+def test_chain_runs_become_a_span_tree():
+    trace, attempt = run_traced_chain()
+    spans = {span.span_id: span for span in trace.spans}
+
+    assert attempt.parent_id == trace.root.span_id
+    assert all(span.end is not None for span in trace.spans)
+    assert all(span.parent_id in spans for span in trace.spans if span is not trace.root)
+
+    def ancestors(span):
+        while span.parent_id:
+            span = spans[span.parent_id]
+            yield span
+
+    chain_spans = [span for span in trace.spans if span.kind == "chain"]
+    assert chain_spans and all(attempt in ancestors(span) for span in chain_spans)
+
+    (retriever,) = [span for span in trace.spans if span.kind == "retriever"]
+    assert spans[retriever.parent_id].kind == "chain"
+    assert retriever.attributes["query"] == "Where does Nick work?"
+    assert sorted(retriever.attributes["doc_ids"]) == ["c1", "c2"]
+    assert retriever.attributes["sources"] == ["about.md", "resume.pdf"]
+
+    llm_spans = [span for span in trace.spans if span.kind == "llm"]
+    assert [(s.attributes["input_tokens"], s.attributes["output_tokens"]) for s in llm_spans] == [(30, 5), (120, 8)]
+
+
+def test_otlp_export_uses_valid_ids_and_parents():
+    trace, _ = run_traced_chain()
+    otlp = to_otlp(trace)
+
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ids = {span["spanId"] for span in spans}
+    assert len(spans) == len(trace.spans)
+    for span in spans:
+        assert re.fullmatch(r"[0-9a-f]{32}", span["traceId"]) and span["traceId"] == trace.trace_id
+        assert re.fullmatch(r"[0-9a-f]{16}", span["spanId"])
+        assert span.get("parentSpanId", trace.root.span_id) in ids
+        assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+
+    (root,) = [span for span in spans if "parentSpanId" not in span]
+    assert root["kind"] == 2 and root["name"] == "test_request"
+    assert {"key": "provider", "value": {"stringValue": "claude"}} in root["attributes"]
+
+
+def test_ring_buffer_keeps_only_the_newest_traces(monkeypatch):
+    monkeypatch.setattr(tracing, "_traces", deque(maxlen=2))
+    traces = [start_trace(f"request {i}") for i in range(3)]
+    for trace in traces:
+        finish_trace(trace)
+
+    assert [t["name"] for t in get_traces()] == ["request 2", "request 1"]
+    assert [t["name"] for t in get_traces(limit=1)] == ["request 2"]
+    assert get_trace(traces[0].trace_id) is None
+    assert get_trace(traces[2].trace_id)["name"] == "request 2"
@@ -0,0 +1,103 @@
+"""
+Cache-warming command.
+
+Runs a curated list of questions through the real invoke_with_fallback path
+and stores the answers in the response cache, so a deploy ships with a hot
+cache. Set RESPONSE_CACHE_PATH so the answers land in the persistent store
+the API workers read from. Questions the fact index answers are skipped:
+the API serves those before it looks at the cache.
+
+Usage (from the repository root):
+    python -m backend.warm_cache [--questions backend/faq_questions.txt] [--concurrency 3]
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from .core.data_loader import load_all_documents
+from .core.fact_index import FactIndex
+from .core.llm_chain import (
+    create_full_retrieval_chain, invoke_with_fallback_result, RESPONSE_CACHE_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "faq_questions.txt")
+WARM_CACHE_TTL = int(os.getenv("WARM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def read_questions(path: str) -> List[str]:
+    """Read one question per line, skipping blanks and # comments."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def split_fact_questions(questions: List[str], fact_index: FactIndex) -> Tuple[List[str], List[str]]:
+    """Split questions into those that need the LLM and those the fact index answers."""
+    to_warm, answered = [], []
+    for question in questions:
+        (answered if fact_index.match(question) else to_warm).append(question)
+    return to_warm, answered
+
+
+def warm_question(retriever, question: str, refresh: bool, ttl: int) -> Dict[str, Any]:
+    """Answer one question and record latency and provider."""
+    start_time = time.time()
+    try:
+        result = invoke_with_fallback_result(
+            retriever, [], question, read_cache=not refresh, cache_ttl=ttl
+        )
+        provider = result.provider
+    except Exception as e:
+        logger.error(f"Failed to warm '{question}': {e}")
+        provider = "error"
+    return {"question": question, "provider": provider, "latency": time.time() - start_time}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute answers for common questions.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS_PATH, help="File with one question per line")
+    parser.add_argument("--concurrency", type=int, default=3, help="Questions answered in parallel")
+    parser.add_argument("--ttl", type=int, default=WARM_CACHE_TTL, help="Cache TTL for warmed answers (seconds)")
+    parser.add_argument("--refresh", action="store_true", help="Recompute answers that are already cached")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if not RESPONSE_CACHE_PATH:
+        logger.warning("RESPONSE_CACHE_PATH is not set; warmed answers will be lost when this process exits")
+
+    docs = load_all_documents()
+    fact_index = FactIndex()
+    fact_index.build(docs)
+    questions, answered = split_fact_questions(read_questions(args.questions), fact_index)
+    for question in answered:
+        print(f"Skipping '{question}': answered by the fact index")
+    retriever = create_full_retrieval_chain(docs)
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        results = list(executor.map(
+            lambda q: warm_question(retriever, q, args.refresh, args.ttl), questions
+        ))
+    total_time = time.time() - start_time
+
+    print(f"{'latency':>9}  {'provider':<12} question")
+    for row in results:
+        print(f"{row['latency']:>8.2f}s  {row['provider']:<12} {row['question']}")
+
+    failed = [row for row in results if row["provider"] in ("unavailable", "error")]
+    print(f"\nWarmed {len(results) - len(failed)}/{len(results)} questions in {total_time:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
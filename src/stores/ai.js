@@ -126,3 +126,11 @@ export function updateChatTitle(chatId, newTitle) {
         allChats.setKey(chatId, { ...chat, title: newTitle });
     }
 }
+
+// Remember the server-side session for a chat, so later messages don't resend the history
+export function setChatSessionId(chatId, sessionId) {
+    const chat = allChats.get()[chatId];
+    if (chat && chat.sessionId !== sessionId) {
+        allChats.setKey(chatId, { ...chat, sessionId });
+    }
+}